@@ -0,0 +1,138 @@
+"""
+Measures RSS of the discord.py state cache under different cache policies.
+
+Synthetic guilds with members and messages are fed straight into a
+ConnectionState, so no gateway connection is needed.
+
+Usage: python -m benchmarks.member_cache [guilds] [members per guild]
+"""
+import asyncio
+import gc
+import multiprocessing
+import sys
+
+import discord
+import psutil
+from discord.state import ConnectionState
+
+from sonata.bot.core.bot import make_member_cache_flags
+
+POLICIES = {
+    "default": {"member_flags": None, "max_messages": 1000},
+    "voice-only": {"member_flags": ["voice"], "max_messages": 1000},
+    "no-members": {"member_flags": [], "max_messages": 1000},
+    "lean": {"member_flags": [], "max_messages": 100},
+}
+MESSAGES_PER_GUILD = 5
+
+
+def make_guild_data(guild_id: int, members: int):
+    channel_id = guild_id + 1
+    return {
+        "id": guild_id,
+        "name": f"Guild {guild_id}",
+        "owner_id": guild_id + 2,
+        "member_count": members,
+        "roles": [{"id": guild_id, "name": "@everyone", "permissions": 104324673}],
+        "channels": [
+            {"id": channel_id, "name": "general", "type": 0, "position": 0}
+        ],
+        "members": [
+            {
+                "user": {
+                    "id": guild_id * 100000 + i,
+                    "username": f"user{i}",
+                    "discriminator": "0001",
+                    "avatar": None,
+                },
+                "roles": [],
+                "joined_at": "2020-01-01T00:00:00+00:00",
+                "deaf": False,
+                "mute": False,
+            }
+            for i in range(members)
+        ],
+    }
+
+
+def make_message_data(guild_id: int, message_id: int):
+    return {
+        "id": message_id,
+        "channel_id": guild_id + 1,
+        "guild_id": guild_id,
+        "author": {
+            "id": guild_id * 100000,
+            "username": "user0",
+            "discriminator": "0001",
+            "avatar": None,
+        },
+        "content": "Hello, world!",
+        "timestamp": "2020-01-01T00:00:00+00:00",
+        "edited_timestamp": None,
+        "tts": False,
+        "mention_everyone": False,
+        "mentions": [],
+        "mention_roles": [],
+        "attachments": [],
+        "embeds": [],
+        "pinned": False,
+        "type": 0,
+    }
+
+
+def measure(policy: dict, guilds: int, members: int, queue: multiprocessing.Queue):
+    loop = asyncio.new_event_loop()
+    intents = discord.Intents.default()
+    intents.members = True
+    state = ConnectionState(
+        dispatch=lambda *args: None,
+        handlers={},
+        hooks={},
+        syncer=None,
+        http=None,
+        loop=loop,
+        intents=intents,
+        member_cache_flags=make_member_cache_flags(intents, policy["member_flags"]),
+        max_messages=policy["max_messages"],
+    )
+    process = psutil.Process()
+    gc.collect()
+    before = process.memory_info().rss
+    message_id = 1
+    for guild_id in range(10, (guilds + 1) * 10, 10):
+        guild = state._add_guild_from_data(make_guild_data(guild_id, members))
+        channel = guild.get_channel(guild_id + 1)
+        for _ in range(MESSAGES_PER_GUILD):
+            message = discord.Message(
+                state=state, channel=channel, data=make_message_data(guild_id, message_id)
+            )
+            if state._messages is not None:
+                state._messages.append(message)
+            message_id += 1
+    gc.collect()
+    queue.put(process.memory_info().rss - before)
+
+
+def main(argv: list):
+    guilds = int(argv[0]) if argv else 1000
+    members = int(argv[1]) if len(argv) > 1 else 100
+    print(f"{guilds} guilds, {members} members per guild")
+    print(f"{'policy':<12}{'RSS, MiB':>12}{'per 1k guilds':>16}{'per 1k members':>16}")
+    for name, policy in POLICIES.items():
+        queue = multiprocessing.Queue()
+        process = multiprocessing.Process(
+            target=measure, args=(policy, guilds, members, queue)
+        )
+        process.start()
+        rss = queue.get()
+        process.join()
+        mib = rss / 1024 ** 2
+        print(
+            f"{name:<12}{mib:>12.2f}"
+            f"{mib / guilds * 1000:>16.2f}"
+            f"{mib / (guilds * members) * 1000:>16.3f}"
+        )
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -1,15 +1,22 @@
 import asyncio
 import logging
+import math
+import multiprocessing
 import os
 from logging import handlers
+from typing import List, Optional
 
 import aiohttp_cors
+import sentry_sdk
 from aiohttp import web
+from sentry_sdk.integrations.aiohttp import AioHttpIntegration
+from sentry_sdk.integrations.logging import LoggingIntegration
 
 from sonata import bot, db
-from sonata.bot import init_bot
+from sonata.bot import init_bot, get_recommended_shards
 from sonata.config import init_config
 from sonata.db import init_db
+from sonata.ipc import init_ipc
 from sonata.views import init_views
 
 try:
@@ -43,6 +50,149 @@ def setup_logger():
     return logger
 
 
+def setup_sentry():
+    sentry_sdk.init(
+        "https://107f8ff27a7a4f5fb08cca733aaaa35f@o439403.ingest.sentry.io/5406178",
+        traces_sample_rate=1.0,
+        integrations=[
+            AioHttpIntegration(),
+            LoggingIntegration(
+                level=logging.INFO,  # Capture info and above as breadcrumbs
+                event_level=logging.ERROR,  # Send errors as events
+            ),
+        ],
+    )
+
+
+def shard_ranges(workers: int, shard_count: int) -> List[List[int]]:
+    """Contiguous shard ranges of the workers.
+
+    Ranges are ``ceil(shard_count / workers)`` long, so trailing workers may get no
+    shards (e.g. 5 shards on 4 workers). Those are dropped, an empty ``shard_ids``
+    means all shards to discord.py.
+    """
+    shards_per_worker = math.ceil(shard_count / workers)
+    ranges = [
+        list(
+            range(
+                worker_id * shards_per_worker,
+                min((worker_id + 1) * shards_per_worker, shard_count),
+            )
+        )
+        for worker_id in range(workers)
+    ]
+    return [shard_ids for shard_ids in ranges if shard_ids]
+
+
+def make_cluster(
+    worker_id: Optional[int], workers: int, shard_count: Optional[int], config
+):
+    """Describes the shards of a process. Worker ID is None for the API process."""
+    sharded = workers > 1
+    shards_per_worker = math.ceil(shard_count / workers) if sharded else None
+    shard_ids = None
+    if sharded and worker_id is not None:
+        shard_ids = shard_ranges(workers, shard_count)[worker_id]
+    return {
+        "worker_id": worker_id,
+        "workers": workers,
+        "shard_count": shard_count if sharded else None,
+        "shard_ids": shard_ids,
+        "shards_per_worker": shards_per_worker,
+        "socket_dir": config.socket_dir,
+        "separate_api": config.separate_api,
+    }
+
+
+def spawn_worker(app, worker_id: int):
+    cluster = app["cluster"]
+    process = multiprocessing.get_context("spawn").Process(
+        target=run_worker,
+        args=(worker_id, cluster["workers"], cluster["shard_count"], app["debug"]),
+        name=f"sonata-worker-{worker_id}",
+        daemon=True,
+    )
+    process.start()
+    app["workers"][worker_id] = process
+
+
+async def supervise_workers(app):
+    """Restarts bot workers that exited, so their shards don't stay offline"""
+    while True:
+        await asyncio.sleep(app["config"]["cluster"].worker_check_interval)
+        for worker_id, process in list(app["workers"].items()):
+            if process.is_alive():
+                continue
+            app["logger"].error(
+                f"Worker {worker_id} exited with code {process.exitcode}, restarting"
+            )
+            spawn_worker(app, worker_id)
+
+
+async def stop_workers(app):
+    app["supervisor"].cancel()
+    for process in app["workers"].values():
+        process.terminate()
+    for process in app["workers"].values():
+        process.join()
+
+
+async def init_cluster(app):
+    """Spawns bot workers.
+
+    Unless the API is separated, the first shard range runs in this process.
+    """
+    cluster_config = app["config"]["cluster"]
+    workers = max(cluster_config.workers, 1)
+    shard_count = cluster_config.shard_count
+    if workers > 1 and shard_count is None:
+        shard_count = await get_recommended_shards(app["config"]["bot"])
+    if workers > 1:
+        workers = len(shard_ranges(workers, shard_count))
+    separate_api = cluster_config.separate_api
+    app["cluster"] = make_cluster(
+        None if separate_api else 0, workers, shard_count, cluster_config
+    )
+    app["workers"] = {}
+    for worker_id in range(0 if separate_api else 1, workers):
+        spawn_worker(app, worker_id)
+    app["supervisor"] = asyncio.ensure_future(supervise_workers(app))
+    app.on_cleanup.append(stop_workers)
+    app["logger"].info(
+        f"Cluster initialized. Workers: {workers}. Separate API: {separate_api}"
+    )
+
+
+def run_worker(worker_id: int, workers: int, shard_count: int, debug: bool = False):
+    """Runs a bot over a range of shards without the web server"""
+    setup_sentry()
+    logger = setup_logger()
+    app = web.Application()
+    app["logger"] = logger
+    app["debug"] = debug
+
+    async def init_worker(app):
+        app["cluster"] = make_cluster(
+            worker_id, workers, shard_count, app["config"]["cluster"]
+        )
+
+    app.on_startup.append(init_config)
+    app.on_startup.append(init_worker)
+    app.on_startup.append(init_db)
+    app.on_startup.append(init_bot)
+    app.on_startup.append(init_ipc)
+    runner = web.AppRunner(app)
+    loop = asyncio.get_event_loop()
+    loop.run_until_complete(runner.setup())
+    logger.info(f"Worker {worker_id} started")
+    try:
+        loop.run_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        loop.run_until_complete(runner.cleanup())
+
+
 def create_app(debug: bool = False):
     logger = setup_logger()
     app = web.Application()
@@ -59,8 +209,10 @@ def create_app(debug: bool = False):
     app["cors"] = cors
     logger.info("Append modules")
     app.on_startup.append(init_config)
+    app.on_startup.append(init_cluster)
     app.on_startup.append(init_db)
     app.on_startup.append(init_bot)
+    app.on_startup.append(init_ipc)
     app.on_startup.append(init_views)
     logger.info("Run server")
     web.run_app(app, host="localhost", port=5000)
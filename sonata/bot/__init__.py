@@ -46,13 +46,32 @@ async def get_twitch_bearer_token(twitch_config):
         return body["access_token"]
 
 
+async def get_recommended_shards(bot_config):
+    async with ClientSession() as session:
+        response = await session.get(
+            "https://discord.com/api/v8/gateway/bot",
+            headers={"Authorization": f"Bot {bot_config.discord_token}"},
+        )
+        body = await response.json()
+        return body["shards"]
+
+
 async def init_bot(app):
+    if app["cluster"]["worker_id"] is None:
+        return  # The API process talks to the bots over IPC
+
     logger = setup_logger()
     loop = asyncio.get_event_loop()
     bot_config = app["config"]["bot"]
+    cluster = app["cluster"]
     twitch_bearer_token = await get_twitch_bearer_token(app["config"]["twitch"])
     app["bot"] = Sonata(
-        logger=logger, app=app, loop=loop, twitch_bearer_token=twitch_bearer_token
+        logger=logger,
+        app=app,
+        loop=loop,
+        twitch_bearer_token=twitch_bearer_token,
+        shard_ids=cluster["shard_ids"],
+        shard_count=cluster["shard_count"],
     )
     for cog in bot_config.cogs:
         load_extension(app["bot"], cog.lower())
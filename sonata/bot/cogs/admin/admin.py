@@ -1,11 +1,10 @@
-import re
-
 import discord
 from babel import Locale
 from discord.ext import commands
 from discord.ext.commands import clean_content
 
 from sonata.bot import core
+from sonata.bot.utils.template import render_template, unknown_placeholders
 from sonata.bot.utils.converters import (
     to_lower,
     locale_to_flag,
@@ -13,6 +12,8 @@ from sonata.bot.utils.converters import (
 )
 from sonata.db.models import Channel, Greeting, BWList, Guild
 
+GREETING_PLACEHOLDERS = {"member", "mention"}
+
 
 class Admin(
     core.Cog,
@@ -52,13 +53,10 @@ class Admin(
         if channel is None:
             return
 
-        replacements = [
-            (r"{{\s*member\s*}}", member.display_name),
-            (r"{{\s*mention\s*}}", member.mention),
-        ]
-        msg = greeting["message"]
-        for old, new in replacements:
-            msg = re.sub(old, new, msg, flags=re.I)
+        msg = render_template(
+            greeting["message"],
+            {"member": member.display_name, "mention": member.mention},
+        )
         await channel.send(msg)
 
     # CHANNELS SETTINGS. PREMIUM ONLY
@@ -403,6 +401,13 @@ class Admin(
             return await ctx.inform(_("I can't send messages in this channel."))
         if len(message) > 2000:
             return await ctx.inform(_("Welcome message cannot exceed 2000 characters."))
+        unknown = unknown_placeholders(message, GREETING_PLACEHOLDERS)
+        if unknown:
+            return await ctx.inform(
+                _("Unknown replacements: {0}").format(
+                    ", ".join(f"`{source}`" for source in unknown)
+                )
+            )
 
         greeting = Greeting(channel_id=channel.id, message=message).dict()
         await ctx.db.guilds.update_one(
@@ -585,6 +590,7 @@ class Admin(
         await ctx.db.guilds.update_one(
             {"id": ctx.guild.id}, {"$addToSet": {"admin_roles": {"$each": role_ids}}}
         )
+        ctx.bot.admin_cache.invalidate(ctx.guild.id)
         await ctx.inform(_("Roles successfully added."))
 
     @guild_role_admin.command(
@@ -609,6 +615,7 @@ class Admin(
         await ctx.db.guilds.update_one(
             {"id": ctx.guild.id}, {"$pull": {"admin_roles": {"$in": role_ids}}}
         )
+        ctx.bot.admin_cache.invalidate(ctx.guild.id)
         await ctx.inform(_("Roles successfully removed."))
 
     @guild_role.group(name="mod", invoke_without_command=True)
@@ -49,6 +49,7 @@ class Emoji(
                 {"guild_id": message.guild.id, "id": emoji_id},
                 {"$inc": {"total": amount}},
             )
+            self.sonata.live_stats.emojis(message.guild.id, {emoji_id: amount})
             if result.matched_count == 0:
                 await self.insert_emoji_stats(
                     emoji_id, message.guild.id, message.created_at
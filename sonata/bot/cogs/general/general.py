@@ -235,7 +235,7 @@ class General(
             name="Канал", value=f"{ctx.channel.name} (ID: {ctx.channel.id})"
         )
         embed.add_field(name="Автор", value=str(ctx.author))
-        await ctx.bot.reports_channel.send(embed=embed)
+        await ctx.bot.send_service(ctx.bot.reports_channel_id, embed=embed)
         await ctx.message.add_reaction("✅")
 
     @core.command()
@@ -5,7 +5,6 @@ from babel import Locale as BabelLocale
 from discord.ext import commands
 
 from sonata.bot import core
-from sonata.bot.utils import i18n
 from sonata.bot.utils.converters import validate_locale, locale_to_flag
 from sonata.bot.utils.misc import make_locale_list
 
@@ -69,5 +68,5 @@ class Locale(
     @locales.command(name="update", hidden=True)
     @commands.is_owner()
     async def locales_update(self, ctx: core.Context):
-        i18n.update_translations()
+        await ctx.bot.app["ipc"].broadcast("update_translations")
         await ctx.inform(_("Locales updated"))
@@ -1,4 +1,6 @@
 import asyncio
+import json
+from contextlib import suppress
 from datetime import datetime, timedelta
 from typing import Union, Optional
 
@@ -9,6 +11,7 @@ from discord.ext.commands import clean_content
 from sonata.bot import core
 from sonata.bot.utils.converters import ModlogCaseConverter
 from sonata.db.models import ModlogCase
+from sonata.ipc import IPCError
 
 action_mapping = {
     discord.AuditLogAction.kick: _("Member kicked"),
@@ -35,6 +38,11 @@ class Modlog(core.Cog):
     def cog_unload(self):
         self._task.cancel()
 
+    @core.Cog.listener()
+    async def on_leadership_lost(self, name: str):
+        self._task.cancel()
+        self._task = self.sonata.loop.create_task(self.dispatch_cases())
+
     @core.Cog.listener()
     async def on_modlog_case_create(self, case: ModlogCase):
         channel = await self.get_modlog_channel(case.guild_id)
@@ -226,22 +234,38 @@ class Modlog(core.Cog):
 
         self._have_data.clear()
         self._next_case = None
-        await self._have_data.wait()
-        return await self.get_active_case(days=days)
+        poll = self.sonata.config["cluster"].scheduler_poll
+        while case is None:  # Cases may be created by other processes
+            with suppress(asyncio.TimeoutError):
+                await asyncio.wait_for(self._have_data.wait(), poll)
+            case = await self.get_active_case(days=days)
+        return case
 
     async def call_case(self, case: ModlogCase):
         await self.sonata.db.modlog_cases.update_one(
             {"id": case.id}, {"$set": {"expired": True}}
         )
-        self.sonata.dispatch("modlog_case_expire", case)
+        try:  # The guild may belong to another process
+            await self.sonata.app["ipc"].request(
+                "modlog_case_expire",
+                guild_id=case.guild_id,
+                case=json.loads(case.json()),
+            )
+        except IPCError as e:
+            self.sonata.logger.warning(f"Failed to expire modlog case {case.id}: {e}")
 
     async def dispatch_cases(self):
         try:
+            await self.sonata.leader.wait()
+            poll = self.sonata.config["cluster"].scheduler_poll
             while not self.sonata.is_closed():
                 case = self._next_case = await self.wait_for_active_cases(days=40)
                 now = datetime.utcnow()
                 if case.expires_at >= now:
                     to_sleep = (case.expires_at - now).total_seconds()
+                    if to_sleep > poll:  # Check for earlier cases
+                        await asyncio.sleep(poll)
+                        continue
                     await asyncio.sleep(to_sleep)
 
                 await self.call_case(case)
@@ -15,7 +15,6 @@ from babel.dates import format_timedelta
 from discord.ext import commands
 
 from sonata.bot import core
-from sonata.bot.cogs import load_extension, unload_extension, reload_extension
 from sonata.bot.utils.converters import (
     GlobalChannel,
     to_lower,
@@ -168,7 +167,9 @@ class Owner(
     async def load(self, ctx: core.Context, cog_name: to_lower):
         _("""Loads cog""")
         await self.sonata.change_presence(status=discord.Status.idle)
-        load_extension(self.sonata, cog_name)
+        await self.sonata.app["ipc"].broadcast(
+            "manage_extension", action="load", cog_name=cog_name
+        )
         await ctx.send(_("I loaded the cog: **{}**.").format(cog_name.capitalize()))
         await self.sonata.change_presence(status=discord.Status.dnd)
 
@@ -179,14 +180,18 @@ class Owner(
             await ctx.send(_("This cog cannot be disabled"))
             return
 
-        unload_extension(self.sonata, cog_name)
+        await self.sonata.app["ipc"].broadcast(
+            "manage_extension", action="unload", cog_name=cog_name
+        )
         await ctx.send(_("I disabled the cog: **{0}**.").format(cog_name.capitalize()))
 
     @cogs.command()
     async def reload(self, ctx: core.Context, cog_name: to_lower):
         _("""Reloads cog""")
         await self.sonata.change_presence(status=discord.Status.idle)
-        reload_extension(self.sonata, cog_name)
+        await self.sonata.app["ipc"].broadcast(
+            "manage_extension", action="reload", cog_name=cog_name
+        )
         await ctx.send(_("I reloaded the cog: **{0}**.").format(cog_name.capitalize()))
         await self.sonata.change_presence(status=discord.Status.dnd)
 
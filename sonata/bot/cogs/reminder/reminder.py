@@ -1,4 +1,6 @@
 import asyncio
+import json
+from contextlib import suppress
 from datetime import datetime, timedelta
 from typing import Union, Any
 
@@ -10,6 +12,7 @@ from discord.ext import commands, menus
 from sonata.bot import core, Sonata
 from sonata.bot.utils.converters import UserFriendlyTime
 from sonata.db.models import Reminder as ReminderModel
+from sonata.ipc import IPCError
 
 
 class ReminderListSource(menus.ListPageSource):
@@ -49,6 +52,11 @@ class Reminder(
     def cog_unload(self):
         self._task.cancel()
 
+    @commands.Cog.listener()
+    async def on_leadership_lost(self, name: str):
+        self._task.cancel()
+        self._task = self.sonata.loop.create_task(self.dispatch_reminders())
+
     @commands.Cog.listener()
     async def on_reminder_complete(self, reminder: ReminderModel):
         try:
@@ -56,7 +64,7 @@ class Reminder(
                 discord.TextChannel, discord.DMChannel
             ] = self.sonata.get_channel(
                 reminder.channel_id
-            ) or self.sonata.fetch_channel(
+            ) or await self.sonata.fetch_channel(
                 reminder.channel_id
             )
         except discord.HTTPException:
@@ -118,17 +126,36 @@ class Reminder(
 
         self._have_data.clear()
         self._current_reminder = None
-        await self._have_data.wait()
-        return await self.get_active_reminder(days=days)
+        poll = self.sonata.config["cluster"].scheduler_poll
+        while reminder is None:  # Reminders may be created by other processes
+            with suppress(asyncio.TimeoutError):
+                await asyncio.wait_for(self._have_data.wait(), poll)
+            reminder = await self.get_active_reminder(days=days)
+        return reminder
 
     async def call_reminder(self, reminder: ReminderModel):
         await self.sonata.db.reminders.update_one(
             {"id": reminder.id}, {"$set": {"active": False}}
         )
-        self.sonata.dispatch("reminder_complete", reminder)
+        ipc = self.sonata.app["ipc"]
+        try:  # The guild may belong to another process, DMs work from any
+            if reminder.guild_id is not None:
+                await ipc.request(
+                    "reminder_complete",
+                    guild_id=reminder.guild_id,
+                    reminder=json.loads(reminder.json()),
+                )
+            else:
+                await ipc.request_any(
+                    "reminder_complete", reminder=json.loads(reminder.json())
+                )
+        except IPCError as e:
+            self.sonata.logger.warning(f"Failed to send reminder {reminder.id}: {e}")
 
     async def dispatch_reminders(self):
         try:
+            await self.sonata.leader.wait()
+            poll = self.sonata.config["cluster"].scheduler_poll
             while not self.sonata.is_closed():
                 reminder = (
                     self._current_reminder
@@ -136,6 +163,9 @@ class Reminder(
                 now = datetime.utcnow()
                 if reminder.expires_at >= now:
                     to_sleep = (reminder.expires_at - now).total_seconds()
+                    if to_sleep > poll:  # Check for earlier reminders
+                        await asyncio.sleep(poll)
+                        continue
                     await asyncio.sleep(to_sleep)
 
                 await self.call_reminder(reminder)
@@ -89,6 +89,7 @@ class Leveling(core.Cog):
         await self.sonata.db.user_stats.update_one(
             {"guild_id": message.guild.id, "user_id": message.author.id}, update
         )
+        self.sonata.live_stats.exp(message.guild.id, message.author.id, exp, lvl)
         if lvl == next_lvl:
             await self.lvl_up(message, exp, lvl)
 
@@ -1,3 +1,4 @@
+import asyncio
 import re
 from contextlib import suppress
 from datetime import datetime
@@ -6,12 +7,14 @@ import discord
 from dateutil.parser import parse
 from discord import abc
 from discord.ext import commands
+from pymongo import UpdateOne
 
 from sonata.bot import core
 from sonata.bot.cogs.stats.leveling import Leveling
 from sonata.bot.utils import i18n
-from sonata.bot.utils.misc import lang_to_locale
+from sonata.bot.utils.misc import lang_to_locale, chunks
 from sonata.db.models import Command, DailyStats, Guild, UserStats, User
+from sonata.db.rollups import rebuild_rollups, rollup_requests, write_rollups
 
 
 class Stats(
@@ -19,27 +22,26 @@ class Stats(
     description=_("The module is responsible for general statistics and level system."),
     colour=discord.Colour.orange(),
 ):
+    reconcile_concurrency = 4
+    bulk_write_size = 1000
+
     def __init__(self, sonata: core.Sonata):
         super().__init__(sonata)
         self.recalc_started_at = None
+        self._reconcile_semaphore = asyncio.Semaphore(self.reconcile_concurrency)
+        self._reconcile_task = None
+
+    def cog_unload(self):
+        if self._reconcile_task is not None:
+            self._reconcile_task.cancel()
 
     @core.Cog.listener()
     async def on_ready(self):
-        for command in self.sonata.walk_commands():
-            guild_conf = self.sonata.db.commands.find(
-                {"name": command.qualified_name}, {"name": True}
-            ).limit(1)
-            if await guild_conf.fetch_next:
-                continue
-
-            command_conf = Command(
-                name=command.qualified_name,
-                cog=command.cog.qualified_name if command.cog else None,
-                enabled=command.enabled,
-            ).dict()
-            await self.sonata.db.commands.insert_one(command_conf)
-        for guild in self.sonata.guilds:
-            await self.on_guild_join(guild)
+        await self.sync_commands()
+        if self._reconcile_task is None or self._reconcile_task.done():
+            self._reconcile_task = self.sonata.loop.create_task(
+                self.reconcile_guilds(self.sonata.guilds)
+            )
 
     @core.Cog.listener()
     async def on_message(self, message: discord.Message):
@@ -55,6 +57,7 @@ class Stats(
         if message.guild:
             await self.update_guild_stats(message)
             await self.update_user_stats(message)
+            self.sonata.live_stats.message(message.guild.id, message.author.id)
 
     @core.Cog.listener()
     async def on_command(self, ctx: core.Context):
@@ -62,6 +65,7 @@ class Stats(
             {"name": ctx.command.qualified_name}, {"$inc": {"invocation_counter": 1}}
         )
         if ctx.guild:
+            self.sonata.live_stats.command(ctx.guild.id)
             await ctx.db.user_stats.update_one(
                 {"guild_id": ctx.guild.id, "user_id": ctx.author.id},
                 {"$inc": {"commands_invoked": 1}},
@@ -73,6 +77,12 @@ class Stats(
                 {"date": date, "guild_id": ctx.guild.id},
                 {"$inc": {"commands_invoked": 1}},
             )
+            await write_rollups(
+                ctx.db,
+                rollup_requests(
+                    ctx.guild.id, ctx.message.created_at, {"commands_invoked": 1}
+                ),
+            )
 
     @core.Cog.listener()
     async def on_command_error(self, ctx: core.Context, exception: Exception):
@@ -103,7 +113,9 @@ class Stats(
                 name="Канал", value=f"{ctx.channel.name} (ID: {ctx.channel.id})"
             )
             embed.add_field(name="Автор", value=str(ctx.author))
-            await self.sonata.errors_channel.send(embed=embed)
+            await self.sonata.send_service(
+                self.sonata.errors_channel_id, embed=embed
+            )
 
     async def define_guild_locale(self, guild: discord.Guild):
         hint = list(i18n.LOCALES)
@@ -131,26 +143,18 @@ class Stats(
 
     @core.Cog.listener()
     async def on_guild_join(self, guild: discord.Guild):
-        guild_conf = await self.sonata.db.guilds.find_one_and_update(
-            {"id": guild.id}, {"$set": {"name": guild.name, "left": None}}
-        )
-        if not guild_conf:
-            guild_conf = Guild(id=guild.id, name=guild.name, owner_id=guild.owner_id)
-            with suppress(Exception):
-                locale = await self.define_guild_locale(guild)
-                if locale:
-                    guild_conf.locale = locale
-            await self.sonata.db.guilds.insert_one(guild_conf.dict())
-        for member in guild.members:
-            await self.on_member_join(member)
+        await self.sync_guilds([guild])
+        async with self._reconcile_semaphore:
+            await self.reconcile_members(guild)
 
     @core.Cog.listener()
     async def on_guild_remove(self, guild: discord.Guild):
         await self.sonata.db.guilds.update_one(
             {"id": guild.id}, {"$currentDate": {"left": True}}
         )
-        for member in guild.members:
-            await self.on_member_remove(member)
+        await self.sonata.db.users.update_many(
+            {"guilds": guild.id}, {"$pull": {"guilds": guild.id}}
+        )
 
     @core.Cog.listener()
     async def on_guild_update(self, before: discord.Guild, after: discord.Guild):
@@ -197,6 +201,117 @@ class Stats(
                 user_conf = User(id=user.id, name=str(user)).dict()
                 await self.sonata.db.users.insert_one(user_conf)
 
+    async def sync_commands(self):
+        """Inserts configs for the commands that are not stored yet"""
+        new_commands = {c.qualified_name: c for c in self.sonata.walk_commands()}
+        cursor = self.sonata.db.commands.find(
+            {"name": {"$in": list(new_commands)}}, {"_id": False, "name": True}
+        )
+        for command_conf in await cursor.to_list(None):
+            new_commands.pop(command_conf["name"], None)
+        if not new_commands:
+            return
+
+        await self.sonata.db.commands.insert_many(
+            [
+                Command(
+                    name=name,
+                    cog=command.cog.qualified_name if command.cog else None,
+                    enabled=command.enabled,
+                ).dict()
+                for name, command in new_commands.items()
+            ],
+            ordered=False,
+        )
+
+    async def create_guild_conf(self, guild: discord.Guild):
+        guild_conf = Guild(id=guild.id, name=guild.name, owner_id=guild.owner_id)
+        with suppress(Exception):
+            locale = await self.define_guild_locale(guild)
+            if locale:
+                guild_conf.locale = locale
+        await self.sonata.db.guilds.insert_one(guild_conf.dict())
+
+    async def sync_guilds(self, guilds):
+        """Marks known guilds as joined and creates configs for the new ones"""
+        guilds = {guild.id: guild for guild in guilds}
+        known = set()
+        for ids in chunks(list(guilds), self.bulk_write_size):
+            cursor = self.sonata.db.guilds.find(
+                {"id": {"$in": ids}}, {"_id": False, "id": True}
+            )
+            known.update(guild_conf["id"] for guild_conf in await cursor.to_list(None))
+
+        await self.bulk_write(
+            self.sonata.db.guilds,
+            [
+                UpdateOne({"id": guild_id}, {"$set": {"name": guild.name, "left": None}})
+                for guild_id, guild in guilds.items()
+                if guild_id in known
+            ],
+        )
+        for guild_id, guild in guilds.items():
+            if guild_id not in known:
+                await self.create_guild_conf(guild)
+
+    async def reconcile_members(self, guild: discord.Guild):
+        """Writes only the difference between guild members and stored memberships
+
+        Stale memberships are removed only if the guild member list is complete."""
+        members = {member.id: str(member) for member in guild.members if not member.bot}
+        cursor = self.sonata.db.users.find(
+            {"guilds": guild.id}, {"_id": False, "id": True, "name": True}
+        )
+        stored = {
+            user_conf["id"]: user_conf.get("name")
+            for user_conf in await cursor.to_list(None)
+        }
+        requests = []
+        for member_id, name in members.items():
+            if member_id not in stored:
+                defaults = User(id=member_id, name=name).dict(
+                    exclude={"id", "name", "guilds"}
+                )
+                requests.append(
+                    UpdateOne(
+                        {"id": member_id},
+                        {
+                            "$set": {"name": name},
+                            "$addToSet": {"guilds": guild.id},
+                            "$setOnInsert": defaults,
+                        },
+                        upsert=True,
+                    )
+                )
+            elif stored[member_id] != name:
+                requests.append(UpdateOne({"id": member_id}, {"$set": {"name": name}}))
+        if guild.chunked:
+            requests.extend(
+                UpdateOne({"id": user_id}, {"$pull": {"guilds": guild.id}})
+                for user_id in stored.keys() - members.keys()
+            )
+        await self.bulk_write(self.sonata.db.users, requests)
+
+    async def reconcile_guilds(self, guilds):
+        guilds = list(guilds)
+        await self.sync_guilds(guilds)
+
+        async def reconcile(guild: discord.Guild):
+            async with self._reconcile_semaphore:
+                try:
+                    await self.reconcile_members(guild)
+                except Exception as e:
+                    self.sonata.logger.warning(
+                        f"Failed to reconcile members of guild {guild.id}: {e}"
+                    )
+
+        await asyncio.gather(*map(reconcile, guilds))
+        self.sonata.logger.info(f"Members of {len(guilds)} guilds reconciled")
+
+    async def bulk_write(self, collection, requests):
+        for batch in chunks(list(requests), self.bulk_write_size):
+            await collection.bulk_write(batch, ordered=False)
+
     async def lvl_up(self, message, exp, lvl):
         if self.recalc_started_at is not None:
             return
@@ -229,6 +344,10 @@ class Stats(
                 date=date, guild_id=guild.id, total_messages=1,
             ).dict()
             await self.sonata.db.daily_stats.insert_one(daily_stats)
+        await write_rollups(
+            self.sonata.db,
+            rollup_requests(guild.id, dt, {"total_messages": 1}, activity=True),
+        )
 
     async def update_guild_stats(self, message: discord.Message):
         result = await self.sonata.db.guilds.update_one(
@@ -249,6 +368,7 @@ class Stats(
         )
         await status.edit(content="```Commands reset```")
         await ctx.db.daily_stats.delete_many({})
+        await ctx.db.stats_rollups.delete_many({})
         await status.edit(content="```Daily stats reset```")
         await ctx.db.user_stats.update_many(
             {},
@@ -293,3 +413,9 @@ class Stats(
                     await self.on_command(ctx)
         self.recalc_started_at = None
         await status.edit(content="```Done```")
+
+    @core.command(name="recalc.rollups", hidden=True)
+    @commands.is_owner()
+    async def recalculate_rollups(self, ctx: core.Context):
+        count = await rebuild_rollups(ctx.db)
+        await ctx.send(f"```{count} rollups rebuilt from daily stats```")
@@ -0,0 +1,140 @@
+import asyncio
+import collections
+import heapq
+import itertools
+import logging
+import time
+from typing import Awaitable, Callable, Hashable
+
+
+class AlertDispatcher:
+    """Delivers alerts with bounded concurrency and rate.
+
+    Jobs of the same bucket (alert channel) run one at a time, since they share a
+    Discord rate limit bucket. A job whose bucket is busy is set aside and queued
+    again once the bucket is free, so workers keep serving other buckets. The
+    overall rate is kept below the global rate limit and drops to a quarter while
+    ``busy`` returns True, so that command responses are not delayed by alerts.
+    Jobs with lower priority values run first.
+    """
+
+    def __init__(
+        self,
+        loop: asyncio.AbstractEventLoop,
+        *,
+        workers: int = 8,
+        rate: float = 20,
+        busy: Callable[[], bool] = None,
+        logger: logging.Logger = None,
+        report_interval: int = 5 * 60,
+    ):
+        self.loop = loop
+        self.rate = rate
+        self.busy = busy
+        self.queue = asyncio.PriorityQueue()
+        self._counter = itertools.count()
+        self._running = set()  # Buckets with a running job
+        self._deferred = {}  # Bucket: heap of jobs waiting for it
+        self._tokens = rate
+        self._updated_at = time.monotonic()
+        self._latencies = collections.deque(maxlen=1000)
+        self.sent = 0
+        self.failed = 0
+        self._workers = [loop.create_task(self.worker()) for _ in range(workers)]
+        if logger is not None:
+            self._workers.append(loop.create_task(self.report(logger, report_interval)))
+
+    async def submit(
+        self, bucket: Hashable, priority: int, factory: Callable[[], Awaitable]
+    ):
+        """Queues the job and waits for its result"""
+        future = self.loop.create_future()
+        await self.queue.put(
+            (priority, next(self._counter), bucket, factory, future, time.monotonic())
+        )
+        return await future
+
+    async def acquire(self):
+        """Token bucket limiting the rate of jobs"""
+        while True:
+            rate = self.rate / 4 if self.busy and self.busy() else self.rate
+            now = time.monotonic()
+            self._tokens = min(
+                self.rate, self._tokens + (now - self._updated_at) * rate
+            )
+            self._updated_at = now
+            if self._tokens >= 1:
+                self._tokens -= 1
+                return
+            await asyncio.sleep((1 - self._tokens) / rate)
+
+    async def worker(self):
+        while True:
+            job = await self.queue.get()
+            self.queue.task_done()
+            bucket = job[2]
+            if bucket in self._running:
+                heapq.heappush(self._deferred.setdefault(bucket, []), job)
+                continue
+
+            self._running.add(bucket)
+            try:
+                await self.run(job)
+            finally:
+                self._running.discard(bucket)
+                deferred = self._deferred.get(bucket)
+                if deferred:
+                    self.queue.put_nowait(heapq.heappop(deferred))
+                    if not deferred:
+                        del self._deferred[bucket]
+
+    async def run(self, job: tuple):
+        priority, count, bucket, factory, future, queued_at = job
+        try:
+            await self.acquire()
+            result = await factory()
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            self.failed += 1
+            if not future.done():
+                future.set_exception(e)
+        else:
+            self.sent += 1
+            if not future.done():
+                future.set_result(result)
+        finally:
+            self._latencies.append(time.monotonic() - queued_at)
+
+    def metrics(self):
+        latencies = sorted(self._latencies)
+
+        def percentile(p: float):
+            if not latencies:
+                return 0.0
+            return round(latencies[min(int(len(latencies) * p), len(latencies) - 1)], 3)
+
+        return {
+            "queue_depth": self.queue.qsize()
+            + sum(map(len, self._deferred.values())),
+            "sent": self.sent,
+            "failed": self.failed,
+            "time_to_alert_p50": percentile(0.5),
+            "time_to_alert_p95": percentile(0.95),
+            "time_to_alert_max": percentile(1),
+        }
+
+    async def report(self, logger: logging.Logger, interval: int):
+        """Logs the metrics when they change"""
+        last = None
+        while True:
+            await asyncio.sleep(interval)
+            metrics = self.metrics()
+            if metrics != last:
+                logger.info(f"Alert dispatcher: {metrics}")
+                last = metrics
+
+    def close(self):
+        for worker in self._workers:
+            worker.cancel()
@@ -1,7 +1,7 @@
 import discord
 from discord.ext import commands
 
-from .twitch import TwitchMixin
+from .twitch import TwitchMixin, ALERT_PLACEHOLDERS, CLOSE_PLACEHOLDERS
 from ... import core
 
 
@@ -73,6 +73,9 @@ class Streams(
         `{{name}}` - streamer name
         `{{views}}` - user's views count"""
         )
+        if not await self.check_template(ctx, message, CLOSE_PLACEHOLDERS):
+            return
+
         await ctx.db.guilds.update_one(
             {"id": ctx.guild.id}, {"$set": {"alerts.close_message": message}}
         )
@@ -98,6 +101,9 @@ class Streams(
         `{{viewers}}` - viewers count
         `{{views}}` - user's views count"""
         )
+        if not await self.check_template(ctx, message, ALERT_PLACEHOLDERS):
+            return
+
         await ctx.db.guilds.update_one(
             {"id": ctx.guild.id}, {"$set": {"alerts.message": message}}
         )
@@ -1,22 +1,29 @@
 import asyncio
+import enum
+import functools
 import logging
 import os
+import random
 import re
 import time
 import weakref
 from contextlib import suppress
 from datetime import timedelta, datetime
 from logging import handlers
-from typing import Optional
+from typing import Optional, Tuple
 
 import discord
 import twitch
 from discord.ext import commands
+from pymongo import UpdateOne
 from twitch.webhook import StreamChanged
 
 from sonata.bot import core
+from sonata.bot.cogs.streams.dispatcher import AlertDispatcher
 from sonata.bot.core import errors
+from sonata.bot.utils.template import render_template, unknown_placeholders
 from sonata.db.models import SubscriptionAlertConfig, TwitchSubscriptionStatus, BWList
+from sonata.ipc import IPCError
 
 HELIX_API = "https://api.twitch.tv/helix"
 STREAMS_URL = HELIX_API + "/streams"
@@ -24,6 +31,9 @@ STREAMS_URL = HELIX_API + "/streams"
 
 CALLBACK_URL = "https://sonata-bot.ru/api/wh/twitch"
 
+ALERT_PLACEHOLDERS = {"link", "name", "title", "game", "viewers", "views"}
+CLOSE_PLACEHOLDERS = {"link", "name", "views"}
+
 
 def limit_subs():
     async def pred(ctx: core.Context):
@@ -36,13 +46,35 @@ def limit_subs():
     return commands.check(pred)
 
 
+@functools.lru_cache(maxsize=1024)
+def compile_title_filter(items: tuple):
+    """Combines the filter items into one case-insensitive regex.
+
+    Items are regexes, invalid ones are matched literally.
+    """
+    patterns = []
+    for item in items:
+        try:
+            re.compile(item)
+        except re.error:
+            item = re.escape(item)
+        patterns.append(f"(?:{item})")
+    return re.compile("|".join(patterns), re.I)
+
+
+@functools.lru_cache(maxsize=4096)
+def match_title(items: tuple, title: str):
+    """Guilds with the same items share the result for a stream title"""
+    return bool(items) and compile_title_filter(items).search(title) is not None
+
+
 class TwitchGameConverter(commands.Converter):
     async def convert(self, ctx: core.Context, argument):
-        client = ctx.bot.twitch_client
+        cache = ctx.bot.twitch_cache
         try:
-            game = await client.get_game(str(int(argument)))
+            game = await cache.get_game(str(int(argument)))
         except ValueError:
-            game = await client.get_game(name=argument)
+            game = await cache.get_game(name=argument)
         if game is None:
             raise commands.BadArgument(
                 _("Twitch game {0} is not found.").format(argument)
@@ -52,14 +84,14 @@ class TwitchGameConverter(commands.Converter):
 
 class TwitchUserConverter(commands.Converter):
     async def convert(self, ctx: core.Context, argument):
-        client = ctx.bot.twitch_client
+        cache = ctx.bot.twitch_cache
         re_result = re.match(r"(https?://)?(www.)?twitch.tv/(\S+)", argument)
         if re_result:
             argument = re_result.group(2)
         try:
-            user = await client.get_user(str(int(argument)))
+            user = await cache.get_user(str(int(argument)))
         except ValueError:
-            user = await client.get_user(login=argument)
+            user = await cache.get_user(login=argument)
         if user is None:
             raise commands.BadArgument(
                 _("Twitch user {0} is not found.").format(argument)
@@ -85,20 +117,75 @@ class TwitchSubscriptionConverter(commands.Converter):
         return self
 
 
+class StreamStatus(enum.Enum):
+    """Streams without a status are offline"""
+
+    online = 1
+    grace_offline = 2  # Offline alert is delayed in case of a reconnect
+
+
+class RenewResult(enum.Enum):
+    renewed = 1
+    failed = 2  # Transient, retried with backoff
+    dropped = 3  # Permanent, e.g. a deleted user, not retried
+
+
 class TwitchMixin(core.Cog):
     twitch_colour = discord.Colour(0x6441A4)
+    offline_grace = 7 * 60
+    offline_retry = 60  # Delay of the offline check after a failed lookup
+    edit_interval = 60  # Minimum seconds between edits of an alert message
+    viewers_threshold = 0.2  # Relative viewer count change worth an edit
+    renew_ahead = 60 * 60  # Subscriptions expiring within it are renewed together
+    renew_batch = 1000
+    renew_concurrency = 10
+    renew_jitter = 0.5  # Max random delay before each renewal
+    renew_backoff = 30  # Doubled on every failed batch
+    max_renew_backoff = 30 * 60
 
     def __init__(self, sonata: core.Sonata):
         self.logger = self.setup_logging()
         self.sonata = sonata
         self.twitch = sonata.twitch_client
+        self.twitch_cache = sonata.twitch_cache
         self._locks = weakref.WeakValueDictionary()
         self._have_data = asyncio.Event()
         self._next_sub = None
-        self._task = sonata.loop.create_task(self.dispatch_subs())
+        self._stream_states = {}
+        self._stream_status = {}
+        self._offline_timers = {}
+        self._alert_messages = {}  # (guild ID, user ID): last alert message
+        self._alert_states = {}  # (guild ID, user ID): (edited at, shown state)
+        self._pending_edits = {}  # (guild ID, user ID): trailing edit timer
+        # (guild ID, user ID): bumped on close, so edits queued before it are dropped
+        self._alert_generations = {}
+        self.dispatcher = AlertDispatcher(
+            sonata.loop,
+            workers=sonata.config["twitch"].alert_workers,
+            rate=sonata.config["twitch"].alert_rate,
+            busy=lambda: sonata.active_commands > 0,
+            logger=self.logger,
+        )
+        self._task = self.start_task()
 
     def cog_unload(self):
         self._task.cancel()
+        self.dispatcher.close()
+        for timer in self._offline_timers.values():
+            timer.cancel()
+        for timer in self._pending_edits.values():
+            timer.cancel()
+
+    def start_task(self):
+        if self.sonata.config["twitch"].polling:
+            return self.sonata.loop.create_task(self.poll_streams())
+
+        return self.sonata.loop.create_task(self.dispatch_subs())
+
+    @core.Cog.listener()
+    async def on_leadership_lost(self, name: str):
+        self._task.cancel()
+        self._task = self.start_task()
 
     @staticmethod
     def setup_logging():
@@ -146,21 +233,137 @@ class TwitchMixin(core.Cog):
 
     @core.Cog.listener()
     async def on_stream_changed(self, data: Optional[dict], user_id: str):
+        self.twitch_cache.set(
+            "stream", user_id, data or None, self.twitch_cache.stream_ttl
+        )
+        if data:
+            self.cancel_offline(user_id)
+            self._stream_status[user_id] = StreamStatus.online
+            await self.process_stream(user_id, twitch.Stream(self.twitch, data))
+        elif user_id not in self._offline_timers:  # Maybe it's just a reconnect
+            self._stream_status[user_id] = StreamStatus.grace_offline
+            self._offline_timers[user_id] = self.sonata.loop.call_later(
+                self.offline_grace, self.resolve_offline, user_id
+            )
+
+    # Methods
+
+    def cancel_offline(self, user_id: str):
+        timer = self._offline_timers.pop(user_id, None)
+        if timer is not None:
+            timer.cancel()
+
+    def resolve_offline(self, user_id: str):
+        self._offline_timers.pop(user_id, None)
+        self.sonata.loop.create_task(self.check_offline(user_id))
+
+    async def check_offline(self, user_id: str):
+        """Resolves the grace period. The stream is checked to avoid spam alerts."""
+        try:
+            data = await self.twitch_cache.get_stream(user_id)
+        except (twitch.HTTPException, OSError, asyncio.TimeoutError) as e:
+            self.logger.warning(
+                f"Failed to check stream. User ID: {user_id}. Error: {e!r}"
+            )
+            if (
+                user_id not in self._offline_timers
+                and self._stream_status.get(user_id) == StreamStatus.grace_offline
+            ):
+                self._offline_timers[user_id] = self.sonata.loop.call_later(
+                    self.offline_retry, self.resolve_offline, user_id
+                )
+            return
+        stream = twitch.Stream(self.twitch, data) if data else None
+        if (
+            user_id in self._offline_timers
+            or self._stream_status.get(user_id) != StreamStatus.grace_offline
+        ):
+            return  # The stream came back while checking
+
+        if stream:
+            self._stream_status[user_id] = StreamStatus.online
+        else:
+            self._stream_status.pop(user_id, None)
+        await self.process_stream(user_id, stream)
+
+    @staticmethod
+    def alert_state(stream: twitch.Stream):
+        return stream.title, stream.game_id, stream.viewer_count
+
+    def is_significant(self, old: Optional[tuple], new: tuple):
+        """Viewer count changes are shown only if they are big enough"""
+        if old is None or old[:2] != new[:2]:
+            return True
+
+        return abs(new[2] - old[2]) > old[2] * self.viewers_threshold
+
+    def cancel_edit(self, key: tuple):
+        timer = self._pending_edits.pop(key, None)
+        if timer is not None:
+            timer.cancel()
+
+    async def throttle_update(
+        self,
+        key: tuple,
+        message: discord.Message,
+        alert_config: dict,
+        default_config: dict,
+        stream: twitch.Stream,
+        user: twitch.User,
+        game: Optional[twitch.Game],
+    ):
+        """Edits the alert at most once per edit interval.
+
+        Updates coming within the interval are coalesced, and the latest one is
+        applied when the interval ends.
+        """
+        edited_at, state = self._alert_states.get(key, (0, None))
+        if not self.is_significant(state, self.alert_state(stream)):
+            return
+
+        self.cancel_edit(key)
+        delay = edited_at + self.edit_interval - time.monotonic()
+        if delay > 0:
+            self._pending_edits[key] = self.sonata.loop.call_later(
+                delay,
+                self.flush_edit,
+                key,
+                message,
+                alert_config,
+                default_config,
+                stream,
+                user,
+                game,
+            )
+            return
+
+        await self.update_alert(
+            message, alert_config, default_config, stream, user, game
+        )
+        self._alert_states[key] = (time.monotonic(), self.alert_state(stream))
+
+    def flush_edit(self, key: tuple, message: discord.Message, *args):
+        self._pending_edits.pop(key, None)
+        generation = self._alert_generations.get(key, 0)
+
+        async def edit():
+            if self._alert_generations.get(key, 0) != generation:
+                return  # Closed while queued
+            with suppress(discord.HTTPException):
+                await self.throttle_update(key, message, *args)
+
+        self.sonata.loop.create_task(
+            self.dispatcher.submit(message.channel.id, 2, edit)
+        )
+
+    async def process_stream(self, user_id: str, stream: Optional[twitch.Stream]):
         lock = self._locks.get(user_id)
         if lock is None:
             lock = asyncio.Lock()
             self._locks[user_id] = lock
         async with lock:
-            if not data:  # Maybe it's just a reconnect
-                await asyncio.sleep(7 * 60)  # Check to avoid spam alerts.
-                stream = await self.twitch.get_stream(user_id)
-            else:
-                stream = twitch.Stream(self.twitch, data)
-            if stream:
-                await stream.get_game()
-                user = await stream.get_user()
-            else:
-                user = await self.twitch.get_user(user_id)
+            user = await self.twitch_cache.get_user(user_id)
+            game = await self.twitch_cache.get_game(stream.game_id) if stream else None
             topic = StreamChanged(user_id)
             sub_status = await self.sonata.db.twitch_subs.find_one(
                 {"topic": str(topic)}, {"guilds": True}
@@ -170,13 +373,42 @@ class TwitchMixin(core.Cog):
             except (KeyError, TypeError):
                 return  # No subs
 
+            # Guilds of other shards are handled by their processes
+            alert_configs = [
+                alert_config
+                for alert_config in alert_configs
+                if self.sonata.owns_guild(alert_config["id"])
+            ]
+            cursor = self.sonata.db.guilds.find(
+                {"id": {"$in": [alert_config["id"] for alert_config in alert_configs]}},
+                {"_id": False, "id": True, "alerts": True, "premium": True},
+            )
+            guild_confs = {
+                guild_conf["id"]: guild_conf for guild_conf in await cursor.to_list(None)
+            }
             aws = [
-                self.process_alert(alert_config, topic, stream, user)
+                self.dispatch_alert(
+                    alert_config,
+                    guild_confs[alert_config["id"]],
+                    topic,
+                    stream,
+                    user,
+                    game,
+                )
                 for alert_config in alert_configs
+                if alert_config["id"] in guild_confs
             ]
-            await asyncio.gather(*aws)
-
-    # Methods
+            requests = []
+            # One failed guild must not drop the message IDs of the others
+            for result in await asyncio.gather(*aws, return_exceptions=True):
+                if isinstance(result, Exception):
+                    self.logger.error(
+                        f"Failed to process alert of {user_id}: {result!r}"
+                    )
+                elif result is not None:
+                    requests.append(result)
+            if requests:
+                await self.sonata.db.twitch_subs.bulk_write(requests, ordered=False)
 
     @staticmethod
     def filter_by_game(game_id: str, game_filter: dict):
@@ -190,67 +422,149 @@ class TwitchMixin(core.Cog):
 
         return True
 
-    async def process_alert(
+    @staticmethod
+    def filter_by_title(title: str, title_filter: Optional[dict]):
+        """Matchers are cached by the item lists, so changed lists get new ones"""
+        if not title_filter:
+            return True
+
+        blacklist = title_filter["blacklist"]
+        whitelist = title_filter["whitelist"]
+        if blacklist["enabled"] and match_title(tuple(blacklist["items"]), title):
+            return False
+
+        if whitelist["enabled"] and not match_title(tuple(whitelist["items"]), title):
+            return False
+
+        return True
+
+    @staticmethod
+    def set_message_id(topic: twitch.Topic, guild_id: int, message_id: Optional[str]):
+        return UpdateOne(
+            {"topic": str(topic), "guilds.id": guild_id},
+            {"$set": {"guilds.$.message_id": message_id}},
+        )
+
+    async def get_alert_message(
+        self, guild: discord.Guild, alert_config: dict, user: twitch.User
+    ) -> Optional[discord.Message]:
+        """Returns the last alert message, fetching it only if it is not cached"""
+        message_id = alert_config.get("message_id")
+        if not message_id:
+            return None
+
+        key = (guild.id, user.id)
+        message = self._alert_messages.get(key)
+        if message is not None and f"{message.channel.id}-{message.id}" == message_id:
+            return message
+
+        channel_id, message_id = message_id.split("-")
+        channel = guild.get_channel(int(channel_id))
+        if channel is None:
+            return None
+        try:
+            message = await channel.fetch_message(int(message_id))
+        except discord.HTTPException:
+            return None
+
+        self._alert_messages[key] = message
+        return message
+
+    def dispatch_alert(
         self,
         alert_config: dict,
+        guild_conf: dict,
         topic: twitch.Topic,
         stream: twitch.Stream,
         user: twitch.User,
+        game: Optional[twitch.Game],
     ):
+        """Queues the alert in the dispatcher.
+
+        The bucket is the alert channel. New alerts go first, then closings and
+        updates of existing alerts.
+        """
+        message_id = alert_config.get("message_id")
+        if message_id:
+            bucket = int(message_id.split("-")[0])
+            priority = 2 if stream else 1
+        else:
+            bucket = alert_config["channel"] or guild_conf["alerts"]["channel"]
+            priority = 0
+        generation = self._alert_generations.get((alert_config["id"], user.id), 0)
+        return self.dispatcher.submit(
+            bucket or alert_config["id"],
+            priority,
+            lambda: self.process_alert(
+                alert_config, guild_conf, topic, stream, user, game, generation
+            ),
+        )
+
+    async def process_alert(
+        self,
+        alert_config: dict,
+        guild_conf: dict,
+        topic: twitch.Topic,
+        stream: twitch.Stream,
+        user: twitch.User,
+        game: Optional[twitch.Game],
+        generation: int = 0,
+    ) -> Optional[UpdateOne]:
+        """Sends, updates or closes the guild alert.
+
+        Returns the message ID update if the alert message has changed. Updates of
+        an alert closed after they were queued are dropped.
+        """
         try:
             guild = self.sonata.get_guild(
                 alert_config["id"]
             ) or await self.sonata.fetch_guild(alert_config["id"])
         except discord.HTTPException:
-            return
-
-        guild_conf = await self.sonata.db.guilds.find_one(
-            {"id": guild.id}, {"alerts": True, "premium": True}
-        )
+            return None
 
         default_config = guild_conf["alerts"]
+        has_message_id = bool(alert_config.get("message_id"))
+        key = (guild.id, user.id)
+        if stream and self._alert_generations.get(key, 0) != generation:
+            return None
 
-        with suppress(KeyError, AttributeError, discord.HTTPException):
-            channel_id, message_id = alert_config["message_id"].split("-")
-            try:
-                delete_message = True
-                channel = guild.get_channel(int(channel_id))
-                message = await channel.fetch_message(int(message_id))
-            except (discord.HTTPException, AttributeError):
-                raise
-            else:
-                if not stream:
-                    await self.close_alert(message, default_config, alert_config, user)
-                else:
-                    delete_message = False
-                    await self.update_alert(
-                        message, alert_config, default_config, stream
-                    )
-            finally:
-                if delete_message:
-                    await self.sonata.db.twitch_subs.update_one(
-                        {"topic": str(topic), "guilds.id": guild.id},
-                        {"$set": {"guilds.$.message_id": None}},
+        message = await self.get_alert_message(guild, alert_config, user)
+        if message is not None:
+            with suppress(discord.HTTPException):
+                if stream:
+                    await self.throttle_update(
+                        key, message, alert_config, default_config, stream, user, game
                     )
-            return
-
-        if not stream:
-            return
-
-        if guild_conf["premium"]:
-            if not self.filter_by_game(stream.game_id, alert_config["filter"]["game"]):
-                return
-
-        try:
-            msg = await self.new_alert(guild, default_config, alert_config, stream)
-        except discord.HTTPException:
-            return
-
-        if msg:
-            await self.sonata.db.twitch_subs.update_one(
-                {"topic": str(topic), "guilds.id": guild.id},
-                {"$set": {"guilds.$.message_id": f"{msg.channel.id}-{msg.id}"}},
+                    return None
+
+                self.cancel_edit(key)
+                await self.close_alert(message, default_config, alert_config, user)
+            self.cancel_edit(key)
+            self._alert_messages.pop(key, None)
+            self._alert_states.pop(key, None)
+            self._alert_generations[key] = self._alert_generations.get(key, 0) + 1
+
+        if stream and (
+            not guild_conf["premium"]
+            or (
+                self.filter_by_game(stream.game_id, alert_config["filter"]["game"])
+                and self.filter_by_title(
+                    stream.title, alert_config["filter"].get("title")
+                )
             )
+        ):
+            try:
+                msg = await self.new_alert(
+                    guild, default_config, alert_config, stream, user, game
+                )
+            except discord.HTTPException:
+                msg = None
+            if msg:
+                self._alert_messages[key] = msg
+                self._alert_states[key] = (time.monotonic(), self.alert_state(stream))
+                return self.set_message_id(topic, guild.id, f"{msg.channel.id}-{msg.id}")
+
+        return self.set_message_id(topic, guild.id, None) if has_message_id else None
 
     async def close_alert(
         self,
@@ -280,6 +594,8 @@ class TwitchMixin(core.Cog):
         default_config: dict,
         alert_config: dict,
         stream: twitch.Stream,
+        user: twitch.User,
+        game: Optional[twitch.Game],
     ):
         if not default_config["enabled"] or not alert_config["enabled"]:
             return
@@ -291,9 +607,9 @@ class TwitchMixin(core.Cog):
             return
 
         cnt = alert_config["message"] or default_config["message"] or "{{link}}"
-        cnt = self._format_content(cnt, stream.user, stream, stream.game)
+        cnt = self._format_content(cnt, user, stream, game)
         self.sonata.locale = await self.sonata.define_locale(channel)
-        embed = self._make_alert_embed(cnt, stream, stream.user, stream.game)
+        embed = self._make_alert_embed(cnt, stream, user, game)
         content = None
         with suppress(discord.HTTPException):
             me = guild.me or await guild.fetch_member(self.sonata.user.id)
@@ -323,11 +639,13 @@ class TwitchMixin(core.Cog):
         alert_config: dict,
         default_config: dict,
         stream: twitch.Stream,
+        user: twitch.User,
+        game: Optional[twitch.Game],
     ):
         cnt = alert_config["message"] or default_config["message"] or "{{link}}"
-        cnt = self._format_content(cnt, stream.user, stream, stream.game)
+        cnt = self._format_content(cnt, user, stream, game)
         await self.sonata.set_locale(message)
-        embed = self._make_alert_embed(cnt, stream, stream.user, stream.game)
+        embed = self._make_alert_embed(cnt, stream, user, game)
         await message.edit(embed=embed)
 
     @staticmethod
@@ -337,23 +655,31 @@ class TwitchMixin(core.Cog):
         stream: twitch.Stream = None,
         game: twitch.Game = None,
     ):
-        replacements = [
-            (r"{{\s*link\s*}}", f"https://www.twitch.tv/{user.login}"),
-            (r"{{\s*name\s*}}", user.display_name),
-            (r"{{\s*views\s*}}", str(user.view_count)),
-        ]
+        values = {
+            "link": f"https://www.twitch.tv/{user.login}",
+            "name": user.display_name,
+            "views": str(user.view_count),
+        }
         if stream:
-            replacements.extend(
-                [
-                    (r"{{\s*title\s*}}", stream.title),
-                    (r"{{\s*viewers\s*}}", str(stream.viewer_count)),
-                ]
-            )
+            values["title"] = stream.title
+            values["viewers"] = str(stream.viewer_count)
         if game:
-            replacements.append((r"{{\s*game\s*}}", game.name))
-        for old, new in replacements:
-            message = re.sub(old, new, message, flags=re.I)
-        return message
+            values["game"] = game.name
+        return render_template(message, values)
+
+    @staticmethod
+    async def check_template(ctx: core.Context, message: str, allowed: set):
+        """Informs about unknown placeholders in the message"""
+        unknown = unknown_placeholders(message, allowed)
+        if unknown:
+            await ctx.inform(
+                _("Unknown replacements: {0}").format(
+                    ", ".join(f"`{source}`" for source in unknown)
+                )
+            )
+            return False
+
+        return True
 
     def _make_alert_embed(
         self,
@@ -386,7 +712,8 @@ class TwitchMixin(core.Cog):
 
     async def extend_subscription(
         self, sub_status: TwitchSubscriptionStatus, lease_seconds: int = 864000
-    ):
+    ) -> Tuple[RenewResult, UpdateOne]:
+        """Returns the result of the renewal and the status update"""
         self.logger.info(
             f"Attempt to renew subscription. Login: {sub_status.login}. "
             f"Topic: {sub_status.topic}"
@@ -401,24 +728,83 @@ class TwitchMixin(core.Cog):
             )
             await subscription.extend()
             expires_at = datetime.utcnow() + timedelta(seconds=lease_seconds)
-            await self.sonata.db.twitch_subs.update_one(
-                {"topic": sub_status.topic}, {"$set": {"expires_at": expires_at}},
-            )
             self.logger.info(
                 f"Subscription renewed. Login: {sub_status.login}. "
                 f"Topic: {sub_status.topic}"
             )
-            return True
-        except twitch.HTTPException as e:
-            await self.sonata.db.twitch_subs.update_one(
-                {"topic": sub_status.topic}, {"$set": {"verified": False}},
+            return (
+                RenewResult.renewed,
+                UpdateOne(
+                    {"topic": sub_status.topic}, {"$set": {"expires_at": expires_at}}
+                ),
             )
+        except twitch.HTTPException as e:
             self.logger.warning(
                 f"Failed to renew subscription. Login: {sub_status.login}. "
                 f"Topic: {sub_status.topic}. Response status: {e.response}. "
                 f"Response data: {e.data}"
             )
-            return False
+            if self.is_permanent(e):  # Without expiry it's not picked up again
+                return (
+                    RenewResult.dropped,
+                    UpdateOne(
+                        {"topic": sub_status.topic},
+                        {"$set": {"verified": False, "expires_at": None}},
+                    ),
+                )
+            return (
+                RenewResult.failed,
+                UpdateOne({"topic": sub_status.topic}, {"$set": {"verified": False}}),
+            )
+        except (OSError, asyncio.TimeoutError) as e:
+            self.logger.warning(
+                f"Failed to renew subscription. Login: {sub_status.login}. "
+                f"Topic: {sub_status.topic}. Error: {e!r}"
+            )
+            return (
+                RenewResult.failed,
+                UpdateOne({"topic": sub_status.topic}, {"$set": {"verified": False}}),
+            )
+
+    @staticmethod
+    def is_permanent(e: twitch.HTTPException):
+        """Client errors other than rate limits won't succeed on retry"""
+        status = getattr(e.response, "status", e.response)
+        return isinstance(status, int) and 400 <= status < 500 and status != 429
+
+    async def renew_subs(self):
+        """Renews subscriptions expiring within the lookahead window.
+
+        Renewals run at bounded concurrency with a random delay, so that Twitch
+        rate limits are not hit when many subscriptions expire together. Returns
+        the number of failed renewals that should be retried.
+        """
+        cursor = self.sonata.db.twitch_subs.find(
+            {
+                "guilds": {"$exists": True, "$ne": []},
+                "expires_at": {
+                    "$lte": datetime.utcnow() + timedelta(seconds=self.renew_ahead)
+                },
+            },
+            {"_id": False},
+            sort=[("expires_at", 1)],
+            limit=self.renew_batch,
+        )
+        subs = [TwitchSubscriptionStatus(**sub) for sub in await cursor.to_list(None)]
+        semaphore = asyncio.Semaphore(self.renew_concurrency)
+
+        async def renew(sub_status: TwitchSubscriptionStatus):
+            async with semaphore:
+                await asyncio.sleep(random.uniform(0, self.renew_jitter))
+                return await self.extend_subscription(sub_status)
+
+        results = await asyncio.gather(*(renew(sub_status) for sub_status in subs))
+        if results:
+            await self.sonata.db.twitch_subs.bulk_write(
+                [request for result, request in results], ordered=False
+            )
+        self.logger.info(f"Renewed {len(results)} subscriptions.")
+        return sum(result == RenewResult.failed for result, request in results)
 
     async def get_active_sub(self, *, days=10):
         cursor = self.sonata.db.twitch_subs.find(
@@ -450,30 +836,95 @@ class TwitchMixin(core.Cog):
         self._have_data.clear()
         self._next_sub = None
         self.logger.info("Wait for active subscriptions.")
-        await self._have_data.wait()
-        return await self.get_active_sub(days=days)
+        poll = self.sonata.config["cluster"].scheduler_poll
+        while sub_status is None:  # Subscriptions may be added by other processes
+            with suppress(asyncio.TimeoutError):
+                await asyncio.wait_for(self._have_data.wait(), poll)
+            sub_status = await self.get_active_sub(days=days)
+        return sub_status
 
     async def dispatch_subs(self):
         try:
+            await self.sonata.leader.wait()
+            poll = self.sonata.config["cluster"].scheduler_poll
+            backoff = 0
             while not self.sonata.is_closed():
                 sub_status = self._next_sub = await self.wait_for_active_subs(days=40)
+                renew_at = sub_status.expires_at - timedelta(seconds=self.renew_ahead)
                 now = datetime.utcnow()
-                if sub_status.expires_at >= now:
-                    to_sleep = (sub_status.expires_at - now).total_seconds()
+                if renew_at >= now:
+                    to_sleep = (renew_at - now).total_seconds()
+                    if to_sleep > poll:  # Check for earlier subscriptions
+                        await asyncio.sleep(poll)
+                        continue
                     self.logger.info(
-                        f"Wait {to_sleep} second before subscription expires "
-                        f"({sub_status.expires_at})"
+                        f"Wait {to_sleep} second before renewing subscriptions "
+                        f"({renew_at})"
                     )
-                    if to_sleep >= 0:
-                        await asyncio.sleep(to_sleep)
+                    await asyncio.sleep(to_sleep)
 
-                await self.extend_subscription(sub_status)
+                if await self.renew_subs():
+                    backoff = min(backoff * 2 or self.renew_backoff, self.max_renew_backoff)
+                    self.logger.warning(f"Retry failed renewals in {backoff} seconds.")
+                    await asyncio.sleep(backoff)
+                else:
+                    backoff = 0
         except asyncio.CancelledError:
             raise
         except (OSError, discord.ConnectionClosed):
             self._task.cancel()
             self._task = self.sonata.loop.create_task(self.dispatch_subs())
 
+    async def poll_once(self):
+        """Fetches streams of all tracked users and dispatches real transitions.
+
+        Streams are requested in batches of 100 user IDs. The state of a stream is
+        its ID, title and game. Users seen for the first time are dispatched if
+        they are online or still have an alert message.
+        """
+        cursor = self.sonata.db.twitch_subs.find(
+            {"guilds": {"$exists": True, "$ne": []}},
+            {"_id": False, "id": True, "guilds.message_id": True},
+        )
+        subs = await cursor.to_list(None)
+        streams = await self.twitch_cache.get_streams([sub["id"] for sub in subs])
+
+        states = {}
+        for sub in subs:
+            user_id = sub["id"]
+            data = streams.get(user_id)
+            state = states[user_id] = (
+                (data["id"], data["title"], data["game_id"]) if data else None
+            )
+            if user_id in self._stream_states:
+                changed = self._stream_states[user_id] != state
+            else:
+                changed = state is not None or any(
+                    alert_config.get("message_id") for alert_config in sub["guilds"]
+                )
+            if changed:
+                try:
+                    await self.sonata.app["ipc"].broadcast(
+                        "dispatch", event="stream_changed", args=[data, user_id]
+                    )
+                except IPCError as e:
+                    self.logger.warning(f"Failed to dispatch stream {user_id}: {e}")
+                    del states[user_id]  # Retry on the next poll
+        self._stream_states = states
+
+    async def poll_streams(self):
+        await self.sonata.leader.wait()
+        interval = self.sonata.config["twitch"].poll_interval
+        while not self.sonata.is_closed():
+            started_at = time.monotonic()
+            try:
+                await self.poll_once()
+            except asyncio.CancelledError:
+                raise
+            except (twitch.HTTPException, OSError) as e:
+                self.logger.warning(f"Failed to poll streams: {e}")
+            await asyncio.sleep(max(interval - (time.monotonic() - started_at), 0))
+
     async def is_subscription_exist(self, topic: twitch.webhook.Topic):
         cursor = self.sonata.db.twitch_subs.find({"topic": str(topic)}, {"id": True})
         return await cursor.fetch_next
@@ -528,7 +979,11 @@ class TwitchMixin(core.Cog):
                 callback=callback,
             ).dict()
             await ctx.db.twitch_subs.insert_one(sub_status)
-        if not await self.is_subscription_verified(topic):
+        if self.sonata.config["twitch"].polling:  # No WebSub subscription needed
+            await ctx.db.twitch_subs.update_one(
+                {"topic": str(topic)}, {"$set": {"verified": True}}
+            )
+        elif not await self.is_subscription_verified(topic):
             async with ctx.typing():
                 try:
                     await subscription.subscribe()
@@ -543,10 +998,26 @@ class TwitchMixin(core.Cog):
         await ctx.inform(
             _("User {0} is now tracked in this guild.").format(user.display_name)
         )
-        resp = await self.twitch.http.get_streams([user.id])
-        data = resp["data"]
+        data = await self.twitch_cache.get_stream(user.id)
         if data:
-            await self.on_stream_changed(data[0], user.id)
+            await self.on_stream_changed(data, user.id)
+
+    @_twitch.command(name="metrics", hidden=True)
+    @commands.is_owner()
+    async def twitch_metrics(self, ctx: core.Context):
+        _("""Alert dispatcher and webhook queue metrics""")
+        metrics = self.dispatcher.metrics()
+        await ctx.inform(
+            "\n".join(f"{name}: `{value}`" for name, value in metrics.items()),
+            title=_("Alert dispatcher"),
+        )
+        webhooks = self.sonata.app.get("webhooks")  # None if the API runs separately
+        if webhooks is not None:
+            metrics = webhooks.metrics()
+            await ctx.inform(
+                "\n".join(f"{name}: `{value}`" for name, value in metrics.items()),
+                title=_("Webhook queue"),
+            )
 
     @_twitch.command(name="clear")
     @commands.has_guild_permissions(manage_messages=True)
@@ -646,7 +1117,7 @@ class TwitchMixin(core.Cog):
         )
         whitelist = sub["guilds"][0]["filter"]["game"]["whitelist"]
         game_ids = whitelist["items"]
-        games = self.twitch.get_games(game_ids)
+        games = await self.twitch_cache.get_games(game_ids)
         embed = discord.Embed(
             colour=self.colour,
             title=_("Game filter whitelist - {0}").format(user.user.display_name),
@@ -657,7 +1128,7 @@ class TwitchMixin(core.Cog):
             else _("Whitelist is **disabled**.")
         )
         try:
-            game_names = [g.name async for g in games]
+            game_names = [g.name for g in games]
             if not game_names:
                 raise TypeError
             embed.description += _("\n**Games**\n") + ", ".join(game_names)
@@ -775,7 +1246,7 @@ class TwitchMixin(core.Cog):
         )
         blacklist = sub["guilds"][0]["filter"]["game"]["blacklist"]
         game_ids = blacklist["items"]
-        games = self.twitch.get_games(game_ids)
+        games = await self.twitch_cache.get_games(game_ids)
         embed = discord.Embed(
             colour=self.colour,
             title=_("Game filter blacklist - {0}").format(user.user.display_name),
@@ -786,7 +1257,7 @@ class TwitchMixin(core.Cog):
             else _("Blacklist is **disabled**.")
         )
         try:
-            game_names = [g.name async for g in games]
+            game_names = [g.name for g in games]
             if not game_names:
                 raise TypeError
             embed.description += _("\n**Games**\n") + ", ".join(game_names)
@@ -1123,6 +1594,9 @@ class TwitchMixin(core.Cog):
         `{{name}}` - streamer name
         `{{views}}` - user's views count"""
         )
+        if not await self.check_template(ctx, message, CLOSE_PLACEHOLDERS):
+            return
+
         await ctx.db.twitch_subs.update_one(
             {"topic": str(user.topic), "guilds.id": ctx.guild.id},
             {"$set": {"guilds.$.close_message": message}},
@@ -1155,6 +1629,9 @@ class TwitchMixin(core.Cog):
         `{{viewers}}` - viewers count
         `{{views}}` - user's views count"""
         )
+        if not await self.check_template(ctx, message, ALERT_PLACEHOLDERS):
+            return
+
         await ctx.db.twitch_subs.update_one(
             {"topic": str(user.topic), "guilds.id": ctx.guild.id},
             {"$set": {"guilds.$.message": message}},
@@ -0,0 +1,35 @@
+import time
+from typing import Optional
+
+
+class AdminCache:
+    """Short-lived admin decisions keyed by guild and user.
+
+    Entries of a guild are dropped together when its roles or admin roles change.
+    """
+
+    ttl = 60
+
+    def __init__(self):
+        self._guilds = {}  # Guild ID: {user ID: (expires at, is admin)}
+
+    def get(self, guild_id: int, user_id: int) -> Optional[bool]:
+        entry = self._guilds.get(guild_id, {}).get(user_id)
+        if entry is None or entry[0] < time.monotonic():
+            return None
+
+        return entry[1]
+
+    def set(self, guild_id: int, user_id: int, is_admin: bool):
+        users = self._guilds.setdefault(guild_id, {})
+        now = time.monotonic()
+        if len(users) > 1000:  # Drop expired entries of big guilds
+            for key in [key for key, entry in users.items() if entry[0] < now]:
+                del users[key]
+        users[user_id] = (now + self.ttl, is_admin)
+
+    def invalidate(self, guild_id: int, user_id: int = None):
+        if user_id is None:
+            self._guilds.pop(guild_id, None)
+        else:
+            self._guilds.get(guild_id, {}).pop(user_id, None)
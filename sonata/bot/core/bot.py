@@ -1,13 +1,10 @@
+import asyncio
 import collections
 import concurrent.futures
-import hashlib
-import hmac
 import inspect
 import traceback
-from contextlib import suppress
 from datetime import datetime
-from json import JSONDecodeError
-from typing import Union, Optional, TYPE_CHECKING, List
+from typing import Union, Optional, TYPE_CHECKING, List, Dict
 
 import aiohttp
 import dbl
@@ -15,22 +12,30 @@ import discord
 import twitch
 from aiocache import cached, Cache
 from aiocache.serializers import PickleSerializer
-from aiohttp import web
 from discord.ext import commands
 from sentry_sdk import capture_exception, configure_scope
 
 from sonata.bot.utils import i18n
+from sonata.bot.utils.twitch_cache import TwitchCache
+from sonata.db.lease import Lease
+from .admin_cache import AdminCache
+from .catalog import Catalog
 from .cog import Cog
 from .context import Context
+from .live_stats import LiveStats
 from .errors import NoPremium
 
 if TYPE_CHECKING:
     from logging import Logger
     from aiohttp.web_app import Application
-    from aiohttp.web_request import Request
 
 
-class Sonata(commands.Bot):
+class Sonata(commands.AutoShardedBot):
+    # Service channels may be on a shard of another worker, see send_service
+    errors_channel_id = 707180649454370827
+    reports_channel_id = 707206460878356551
+    log_channel_id = 714881722163920917
+
     def __init__(
         self,
         app: "Application",
@@ -41,6 +46,10 @@ class Sonata(commands.Bot):
     ):
         self.app = app
         self.config = config = app["config"]
+        self.catalog = Catalog(self)
+        self.admin_cache = AdminCache()
+        self.live_stats = LiveStats()
+        cache_config = config["cache"]
         intents = discord.Intents.default()
         intents.members = True
         super().__init__(
@@ -48,6 +57,11 @@ class Sonata(commands.Bot):
             command_prefix=determine_prefix,
             status=discord.Status.idle,
             intents=intents,
+            member_cache_flags=make_member_cache_flags(
+                intents, cache_config.member_flags
+            ),
+            chunk_guilds_at_startup=cache_config.chunk_guilds_at_startup,
+            max_messages=cache_config.max_messages,
             *args,
             **kwargs,
         )
@@ -61,6 +75,7 @@ class Sonata(commands.Bot):
         self.twitch_client = twitch.Client(
             config["twitch"].client_id, twitch_bearer_token, self.session
         )
+        self.twitch_cache = TwitchCache(self.twitch_client)
         self.dbl_client = (
             dbl.DBLClient(
                 self, config["bot"].dbl_token, session=self.session, autopost=True
@@ -68,15 +83,17 @@ class Sonata(commands.Bot):
             if config["bot"].dbl_token
             else None
         )
-        self.service_guild: Optional[discord.Guild] = None
-        self.errors_channel: Optional[discord.TextChannel] = None
-        self.reports_channel: Optional[discord.TextChannel] = None
-        self.log_channel: Optional[discord.TextChannel] = None
-        cors = self.app["cors"]
-        resource = cors.add(self.app.router.add_resource(r"/wh/twitch/{topic}/{id}"))
-        cors.add(resource.add_route("GET", self.handler_get))
-        cors.add(resource.add_route("POST", self.handler_post))
         self.cache = Cache()
+        self._chunk_tasks = {}
+        self.active_commands = 0  # Background senders back off while it's nonzero
+        self.leader = Lease(
+            self.db.leases,
+            "schedulers",
+            ttl=config["cluster"].lease_ttl,
+            heartbeat=config["cluster"].lease_heartbeat,
+            dispatch=self.dispatch,
+        )
+        self._leader_task = None
 
     # Properties
 
@@ -87,6 +104,13 @@ class Sonata(commands.Bot):
     @property
     def description(self):
         """Applies locale when getting"""
+        return self.catalog.get(self.locale)["description"]
+
+    @description.setter
+    def description(self, value):
+        self._description = value
+
+    def make_description(self):
         cogs = collections.OrderedDict(sorted(self.cogs.items()))
         desc = f"{_(self._description)}\n\n" + "\n".join(
             f"`{name}` {_(cog.description)}"
@@ -96,10 +120,6 @@ class Sonata(commands.Bot):
 
         return inspect.cleandoc(desc)
 
-    @description.setter
-    def description(self, value):
-        self._description = value
-
     @property
     def locale(self):
         return i18n.current_locale.get()
@@ -114,69 +134,9 @@ class Sonata(commands.Bot):
             self.user.id, permissions=discord.Permissions(1409805510),
         )
 
-    # Handlers
-
-    async def handler_get(self, request: "Request"):
-        query = request.query
-        try:
-            if query["hub.mode"] == "denied":
-                return web.Response(text="OK", status=200)
-
-            if query["hub.challenge"]:
-                self.dispatch(
-                    "subscription_verify", query["hub.topic"], query["hub.mode"]
-                )
-                return web.Response(
-                    body=query["hub.challenge"], content_type="text/plain"
-                )
-        except KeyError:
-            return web.Response(text="Bad Request", status=400)
-
-        return web.Response(text="OK", status=200)
-
-    async def handler_post(self, request: "Request"):
-        if not self.app["debug"]:
-            body = await request.read()
-            signature = (
-                "sha256="
-                + hmac.new(
-                    self.config["twitch"].hub_secret.encode("utf-8"),
-                    body,
-                    hashlib.sha256,
-                ).hexdigest()
-            )
-            if signature != request.headers.get("X-Hub-Signature"):
-                return web.Response(text="Forbidden", status=403)
-
-        try:
-            json = await request.json()
-            data = json["data"]
-        except JSONDecodeError:
-            return web.Response(text="Bad Request", status=400)
-
-        try:
-            data = data[0]
-        except IndexError:
-            data = None
-
-        events = {"streams": "stream_changed"}
-        self.dispatch(
-            events[request.match_info["topic"]], data, request.match_info["id"]
-        )
-
-        return web.Response(text="OK", status=200)
-
     # Events
 
     async def on_ready(self):
-        with suppress(discord.HTTPException):
-            self.service_guild = service_guild = self.get_guild(
-                313726240710197250
-            ) or await self.fetch_guild(313726240710197250)
-            self.errors_channel = service_guild.get_channel(707180649454370827)
-            self.reports_channel = service_guild.get_channel(707206460878356551)
-            self.log_channel = service_guild.get_channel(714881722163920917)
-
         await self.change_presence(
             status=discord.Status.dnd, activity=discord.Game("https://www.sonata-bot.ru/")
         )
@@ -192,22 +152,41 @@ class Sonata(commands.Bot):
         await self.process_commands(message)
 
     async def on_guild_join(self, guild: discord.Guild):
-        await self.log_channel.send(
+        await self.send_service(
+            self.log_channel_id,
             f"New guild joined: {guild.name}.\n'"
             f"ID: {guild.id}.\n"
             f"Owner: {guild.owner}\n"
-            f"Members: {guild.member_count}"
+            f"Members: {guild.member_count}",
         )
-        await self.log_channel.send(
-            f"Channels: ```{', '.join(map(str, guild.channels))}```"
+        await self.send_service(
+            self.log_channel_id,
+            f"Channels: ```{', '.join(map(str, guild.channels))}```",
         )
 
+    async def on_member_update(self, before: discord.Member, after: discord.Member):
+        if before.roles != after.roles:
+            self.admin_cache.invalidate(after.guild.id, after.id)
+
+    async def on_guild_role_update(self, before: discord.Role, after: discord.Role):
+        if before.permissions != after.permissions:
+            self.admin_cache.invalidate(after.guild.id)
+
+    async def on_guild_role_delete(self, role: discord.Role):
+        self.admin_cache.invalidate(role.guild.id)
+
+    async def on_guild_update(self, before: discord.Guild, after: discord.Guild):
+        if before.owner_id != after.owner_id:
+            self.admin_cache.invalidate(after.id)
+
     async def on_guild_remove(self, guild: discord.Guild):
-        await self.log_channel.send(
+        self.admin_cache.invalidate(guild.id)
+        await self.send_service(
+            self.log_channel_id,
             f"Guild removed: {guild.name}.\n'"
             f"ID: {guild.id}.\n"
             f"Owner: {guild.owner}\n"
-            f"Members: {guild.member_count}"
+            f"Members: {guild.member_count}",
         )
 
     async def on_command_error(
@@ -285,6 +264,14 @@ class Sonata(commands.Bot):
 
     # Methods
 
+    def add_cog(self, cog):
+        super().add_cog(cog)
+        self.catalog.invalidate()
+
+    def remove_cog(self, name):
+        super().remove_cog(name)
+        self.catalog.invalidate()
+
     @cached(
         ttl=60 * 5,
         serializer=PickleSerializer(),
@@ -346,22 +333,76 @@ class Sonata(commands.Bot):
         if isinstance(search_term, str):
             return discord.utils.get(self.emojis, name=search_term)
 
-    async def is_admin(self, member: discord.Member):
-        if member.guild_permissions.administrator or await self.is_owner(member):
+    def owns_guild(self, guild_id: int):
+        """Returns whether the guild belongs to the shards of this process"""
+        if self.shard_ids is None or self.shard_count is None:
             return True
-        guild = await self.db.guilds.find_one(
-            {"id": member.guild.id}, {"admin_roles": True}
+
+        return (guild_id >> 22) % self.shard_count in self.shard_ids
+
+    async def send_service(
+        self, channel_id: int, content: str = None, *, embed: discord.Embed = None
+    ):
+        """Sends to a service channel through the HTTP API.
+
+        The channel is not cached by workers that don't run its shard.
+        """
+        await self.http.send_message(
+            channel_id, content, embed=embed.to_dict() if embed else None
         )
-        if (
-            guild
-            and "admin_roles" in guild
-            and discord.utils.find(
-                lambda role: role.id in guild["admin_roles"], member.roles
-            )
-            is not None
-        ):
-            return True
-        return False
+
+    async def is_admin(self, member: discord.Member):
+        """Decisions are cached for a short time"""
+        is_admin = self.admin_cache.get(member.guild.id, member.id)
+        if is_admin is None:
+            is_admin = (await self.admin_members([member]))[member.guild.id]
+        return is_admin
+
+    async def admin_members(self, members: List[discord.Member]) -> Dict[int, bool]:
+        """Resolves whether members of different guilds are admins.
+
+        Admin roles of all guilds are loaded with one query. Returns the decisions
+        by guild ID.
+        """
+        decisions = {}
+        unresolved = []
+        for member in members:
+            is_admin = self.admin_cache.get(member.guild.id, member.id)
+            if is_admin is not None:
+                decisions[member.guild.id] = is_admin
+            elif member.guild_permissions.administrator or await self.is_owner(member):
+                decisions[member.guild.id] = True
+                self.admin_cache.set(member.guild.id, member.id, True)
+            else:
+                unresolved.append(member)
+        if not unresolved:
+            return decisions
+
+        cursor = self.db.guilds.find(
+            {"id": {"$in": [member.guild.id for member in unresolved]}},
+            {"_id": False, "id": True, "admin_roles": True},
+        )
+        admin_roles = {
+            guild["id"]: set(guild.get("admin_roles") or [])
+            async for guild in cursor
+        }
+        for member in unresolved:
+            roles = admin_roles.get(member.guild.id, set())
+            is_admin = any(role.id in roles for role in member.roles)
+            decisions[member.guild.id] = is_admin
+            self.admin_cache.set(member.guild.id, member.id, is_admin)
+        return decisions
+
+    async def ensure_chunked(self, guild: discord.Guild):
+        """Requests guild members on first use if lazy chunking is enabled"""
+        if guild.chunked or not self.config["cache"].lazy_chunking:
+            return
+
+        task = self._chunk_tasks.get(guild.id)
+        if task is None:
+            task = self._chunk_tasks[guild.id] = self.loop.create_task(guild.chunk())
+            task.add_done_callback(lambda t: self._chunk_tasks.pop(guild.id, None))
+        await asyncio.shield(task)
 
     async def process_commands(self, message: discord.Message):
         await self.set_locale(message)
@@ -370,6 +411,7 @@ class Sonata(commands.Bot):
         delete_message = False
         if ctx.command:
             if ctx.guild:
+                await self.ensure_chunked(ctx.guild)
                 guild = await self.db.guilds.find_one(
                     {"id": message.guild.id},
                     {
@@ -398,7 +440,13 @@ class Sonata(commands.Bot):
             else:
                 ctx.command.enabled = True
 
-        await self.invoke(ctx)
+        if ctx.command:
+            self.active_commands += 1
+        try:
+            await self.invoke(ctx)
+        finally:
+            if ctx.command:
+                self.active_commands -= 1
         if (
             ctx.guild
             and delete_message
@@ -470,8 +518,51 @@ class Sonata(commands.Bot):
         return True
 
     async def start(self, *args, **kwargs):
+        self._leader_task = self.loop.create_task(self.leader.run())
         await super().start(self.config["bot"].discord_token, *args, **kwargs)
 
+    async def close(self):
+        if self._leader_task is not None:
+            self._leader_task.cancel()
+            await self.leader.release()
+        await super().close()
+
+
+# Intents the member cache flags depend on
+MEMBER_FLAG_INTENTS = {
+    "online": "presences",
+    "voice": "voice_states",
+    "joined": "members",
+}
+
+
+def make_member_cache_flags(
+    intents: discord.Intents, flags: Optional[List[str]] = None
+) -> discord.MemberCacheFlags:
+    """Builds member cache flags from their names.
+
+    If flags are not specified, they are derived from the intents. Unknown flags
+    and flags whose intent is disabled are rejected here rather than at connect.
+    """
+    if flags is None:
+        return discord.MemberCacheFlags.from_intents(intents)
+
+    member_cache_flags = discord.MemberCacheFlags.none()
+    for flag in flags:
+        if flag not in discord.MemberCacheFlags.VALID_FLAGS:
+            raise ValueError(
+                f"Unknown member cache flag {flag!r} in Cache.member_flags, "
+                f"valid flags: {', '.join(discord.MemberCacheFlags.VALID_FLAGS)}"
+            )
+        intent = MEMBER_FLAG_INTENTS.get(flag)
+        if intent is not None and not getattr(intents, intent):
+            raise ValueError(
+                f"Member cache flag {flag!r} in Cache.member_flags requires the "
+                f"{intent} intent"
+            )
+        setattr(member_cache_flags, flag, True)
+    return member_cache_flags
+
 
 async def determine_prefix(bot: Sonata, msg: discord.Message):
     if msg.guild:
@@ -0,0 +1,82 @@
+import bisect
+import hashlib
+import json
+from typing import TYPE_CHECKING, List
+
+from sonata.bot.utils import i18n
+from .command import Command
+
+if TYPE_CHECKING:
+    from .bot import Sonata
+
+
+class Catalog:
+    """Translated cog and command docs, built once per locale.
+
+    Invalidated when cogs are added or removed and when translations are updated.
+    """
+
+    def __init__(self, bot: "Sonata"):
+        self.bot = bot
+        self._locales = {}
+
+    def get(self, locale: str) -> dict:
+        catalog = self._locales.get(locale)
+        if catalog is None:
+            catalog = self._locales[locale] = self.build(locale)
+        return catalog
+
+    def build(self, locale: str) -> dict:
+        token = i18n.current_locale.set(locale)
+        try:
+            cogs = {
+                name: cog.to_dict()
+                for name, cog in sorted(self.bot.cogs.items())
+                if name != "Owner"
+            }
+            commands = {}
+            index = []  # (qualified name or alias, qualified name)
+            for cmd in self.bot.walk_commands():
+                # `enabled` is set per guild on invocation, so it's not used here
+                if cmd.cog is None or cmd.cog.qualified_name == "Owner" or cmd.hidden:
+                    continue
+                commands.setdefault(cmd.qualified_name, cmd.to_dict())
+                parent = f"{cmd.full_parent_name} " if cmd.full_parent_name else ""
+                index.append((cmd.qualified_name, cmd.qualified_name))
+                index.extend(
+                    (parent + alias, cmd.qualified_name) for alias in cmd.aliases
+                )
+            index = sorted(set(index))
+            # Same across processes as long as the code and translations are
+            version = hashlib.sha1(
+                json.dumps([cogs, commands], sort_keys=True, default=str).encode()
+            ).hexdigest()
+            return {
+                "version": version,
+                "description": self.bot.make_description(),
+                "cogs": cogs,
+                "commands": commands,
+                "index_keys": [key for key, name in index],
+                "index": index,
+            }
+        finally:
+            i18n.current_locale.reset(token)
+
+    def search(self, locale: str, query: str, limit: int) -> List[dict]:
+        """Finds commands whose qualified names or aliases start with the query"""
+        catalog = self.get(locale)
+        keys, index = catalog["index_keys"], catalog["index"]
+        found = []
+        for i in range(bisect.bisect_left(keys, query), len(keys)):
+            key, name = index[i]
+            if not key.startswith(query) or len(found) == limit:
+                break
+            if name not in found:
+                found.append(name)
+        return [catalog["commands"][name] for name in sorted(found)]
+
+    def invalidate(self):
+        self._locales.clear()
+        for cmd in self.bot.walk_commands():
+            if isinstance(cmd, Command):
+                cmd.clear_doc_cache()
@@ -19,7 +19,7 @@ class Cog(commands.Cog, metaclass=CogMeta):
             "commands": [
                 c.to_dict()
                 for c in sorted(self.get_commands(), key=lambda c: c.name)
-                if c.enabled and not c.hidden
+                if not c.hidden
             ],
         }
 
@@ -9,8 +9,12 @@ class Command(commands.Command):
     def __init__(self, func, **kwargs):
         self._examples = kwargs.get("examples")
         self.raw_doc = getattr(func, "__doc__", None)
+        self._help_cache = {}  # Locale: translated help
         super().__init__(func, **kwargs)
 
+    def clear_doc_cache(self):
+        self._help_cache.clear()
+
     def to_dict(self):
         return {
             "name": self.name,
@@ -43,14 +47,23 @@ class Command(commands.Command):
     @property
     def help(self):
         """Applies locale when getting"""
+        locale = i18n.current_locale.get(i18n.default_locale)
+        try:
+            return self._help_cache[locale]
+        except KeyError:
+            pass
+
         try:
-            return inspect.cleandoc(_(self.raw_doc))
+            doc = inspect.cleandoc(_(self.raw_doc))
         except AttributeError:
-            return _(self._help)
+            doc = _(self._help)
+        self._help_cache[locale] = doc
+        return doc
 
     @help.setter
     def help(self, value):
         self._help = value
+        self._help_cache = {}
 
 
 class Group(Command, commands.Group):
@@ -59,7 +72,7 @@ class Group(Command, commands.Group):
         d["commands"] = [
             c.to_dict()
             for c in sorted(self.commands, key=lambda c: c.name)
-            if c.enabled and not c.hidden
+            if not c.hidden
         ]
         return d
 
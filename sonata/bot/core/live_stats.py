@@ -0,0 +1,81 @@
+import time
+from typing import Dict, Optional
+
+
+class LiveStats:
+    """In-memory stats deltas of guilds open in the dashboard.
+
+    Counters are kept only while a guild is watched, so other guilds cost nothing.
+    A guild is watched for ``watch_ttl`` seconds after its deltas were last taken.
+    """
+
+    watch_ttl = 30
+
+    def __init__(self):
+        self._watched = {}  # Guild ID: watched until
+        self._deltas = {}  # Guild ID: delta
+
+    def delta(self, guild_id: int) -> Optional[dict]:
+        """The delta to update, None if the guild is not watched"""
+        watched_until = self._watched.get(guild_id)
+        if watched_until is None:
+            return None
+        if watched_until < time.monotonic():
+            del self._watched[guild_id]
+            self._deltas.pop(guild_id, None)
+            return None
+
+        delta = self._deltas.get(guild_id)
+        if delta is None:
+            delta = self._deltas[guild_id] = {
+                "messages": 0,
+                "commands": 0,
+                "members": {},
+                "emojis": {},
+            }
+        return delta
+
+    def member(self, delta: dict, user_id: int) -> dict:
+        member = delta["members"].get(user_id)
+        if member is None:
+            member = delta["members"][user_id] = {"user_id": user_id, "messages": 0}
+        return member
+
+    def message(self, guild_id: int, user_id: int):
+        delta = self.delta(guild_id)
+        if delta is not None:
+            delta["messages"] += 1
+            self.member(delta, user_id)["messages"] += 1
+
+    def command(self, guild_id: int):
+        delta = self.delta(guild_id)
+        if delta is not None:
+            delta["commands"] += 1
+
+    def exp(self, guild_id: int, user_id: int, exp: int, lvl: int):
+        delta = self.delta(guild_id)
+        if delta is not None:
+            self.member(delta, user_id).update(exp=exp, lvl=lvl)
+
+    def emojis(self, guild_id: int, amounts: Dict[int, int]):
+        delta = self.delta(guild_id)
+        if delta is not None:
+            for emoji_id, amount in amounts.items():
+                delta["emojis"][emoji_id] = delta["emojis"].get(emoji_id, 0) + amount
+
+    def take(self, guild_id: int) -> Optional[dict]:
+        """Watches the guild and returns the changes since the last call"""
+        self._watched[guild_id] = time.monotonic() + self.watch_ttl
+        delta = self._deltas.pop(guild_id, None)
+        if delta is None:
+            return None
+
+        return {
+            "messages": delta["messages"],
+            "commands": delta["commands"],
+            "members": list(delta["members"].values()),
+            "emojis": [
+                {"id": emoji_id, "total": amount}
+                for emoji_id, amount in delta["emojis"].items()
+            ],
+        }
@@ -0,0 +1,40 @@
+import functools
+import re
+from typing import Iterable, List, Optional, Tuple
+
+PLACEHOLDER = re.compile(r"{{\s*(\w+)\s*}}")
+
+
+@functools.lru_cache(maxsize=4096)
+def compile_template(text: str) -> Tuple[Tuple[str, Optional[str]], ...]:
+    """Splits the text into literal and placeholder segments.
+
+    A segment is its source text and the lowercased placeholder name, or None for
+    literals.
+    """
+    segments = []
+    pos = 0
+    for match in PLACEHOLDER.finditer(text):
+        if match.start() > pos:
+            segments.append((text[pos : match.start()], None))
+        segments.append((match.group(0), match.group(1).lower()))
+        pos = match.end()
+    if pos < len(text):
+        segments.append((text[pos:], None))
+    return tuple(segments)
+
+
+def render_template(text: str, values: dict) -> str:
+    """Placeholders without a value are left as is"""
+    return "".join(
+        values.get(name, source) if name else source
+        for source, name in compile_template(text)
+    )
+
+
+def unknown_placeholders(text: str, allowed: Iterable[str]) -> List[str]:
+    return [
+        source
+        for source, name in compile_template(text)
+        if name is not None and name not in allowed
+    ]
@@ -0,0 +1,175 @@
+import asyncio
+import time
+from typing import Awaitable, Callable, Dict, Hashable, Iterable, List, Optional
+
+import twitch
+
+from .misc import chunks
+
+
+class TwitchCache:
+    """TTL cache in front of the Twitch client.
+
+    Games are kept for a day, users for an hour (by both ID and login) and streams
+    for half a minute. Concurrent misses of the same key share one request, and
+    multiple IDs are requested in batches where the API allows it. Streams are
+    cached as raw Helix data, None meaning offline.
+    """
+
+    game_ttl = 24 * 60 * 60
+    user_ttl = 60 * 60
+    stream_ttl = 30
+    negative_ttl = 60  # Games and users that are not found
+    max_size = 50000
+
+    def __init__(self, client: twitch.Client):
+        self.client = client
+        self._entries = {}  # (kind, key): (expires at, value)
+        self._inflight = {}  # (kind, key): fetching task
+
+    def get(self, kind: str, key: Hashable):
+        entry = self._entries.get((kind, key))
+        if entry is None:
+            return None, False
+
+        if entry[0] < time.monotonic():
+            del self._entries[(kind, key)]
+            return None, False
+
+        return entry[1], True
+
+    def set(self, kind: str, key: Hashable, value, ttl: int):
+        if len(self._entries) >= self.max_size:
+            self.purge()
+        self._entries.pop((kind, key), None)  # Oldest writes are purged first
+        self._entries[(kind, key)] = (time.monotonic() + ttl, value)
+
+    def purge(self):
+        now = time.monotonic()
+        self._entries = {k: v for k, v in self._entries.items() if v[0] >= now}
+        # Still full, drop the oldest half
+        if len(self._entries) >= self.max_size:
+            keys = list(self._entries)[: len(self._entries) // 2]
+            for key in keys:
+                del self._entries[key]
+
+    async def load(
+        self,
+        kind: str,
+        keys: Iterable[Hashable],
+        ttl: int,
+        fetch: Callable[[List[Hashable]], Awaitable[Dict[Hashable, object]]],
+        negative_ttl: int = None,
+    ) -> dict:
+        """Returns cached values, requesting all misses with a single fetch call"""
+        result, tasks, missing = {}, {}, []
+        for key in keys:
+            value, found = self.get(kind, key)
+            if found:
+                result[key] = value
+            elif (kind, key) in self._inflight:
+                tasks[key] = self._inflight[(kind, key)]
+            elif key not in missing:
+                missing.append(key)
+
+        if missing:
+            if negative_ttl is None:
+                negative_ttl = self.negative_ttl
+            task = asyncio.ensure_future(
+                self._fetch(kind, missing, ttl, negative_ttl, fetch)
+            )
+            for key in missing:
+                tasks[key] = self._inflight[(kind, key)] = task
+
+        for key, task in tasks.items():
+            result[key] = (await asyncio.shield(task)).get(key)
+        return result
+
+    async def _fetch(
+        self, kind: str, keys: list, ttl: int, negative_ttl: int, fetch: Callable
+    ):
+        try:
+            values = await fetch(keys)
+            for key in keys:
+                value = values.get(key)
+                self.set(kind, key, value, ttl if value is not None else negative_ttl)
+            return values
+        finally:
+            for key in keys:
+                self._inflight.pop((kind, key), None)
+
+    # Users
+
+    async def get_user(
+        self, user_id: str = None, *, login: str = None
+    ) -> Optional[twitch.User]:
+        if user_id is not None:
+            return (await self.get_users([user_id]))[user_id]
+
+        async def fetch(logins):
+            user = await self.client.get_user(login=logins[0])
+            if user is not None:
+                self.set("user", user.id, user, self.user_ttl)
+            return {logins[0]: user}
+
+        login = login.lower()
+        return (await self.load("login", [login], self.user_ttl, fetch))[login]
+
+    async def get_users(self, user_ids: Iterable[str]) -> Dict[str, twitch.User]:
+        async def fetch(ids):
+            users = await asyncio.gather(*(self.client.get_user(id) for id in ids))
+            for user in users:
+                if user is not None:
+                    self.set("login", user.login.lower(), user, self.user_ttl)
+            return dict(zip(ids, users))
+
+        return await self.load("user", user_ids, self.user_ttl, fetch)
+
+    # Games
+
+    async def get_game(
+        self, game_id: str = None, *, name: str = None
+    ) -> Optional[twitch.Game]:
+        if game_id is not None:
+            if not game_id:  # Streams without a category
+                return None
+            games = await self.load("game", [game_id], self.game_ttl, self._fetch_games)
+            return games[game_id]
+
+        async def fetch(names):
+            game = await self.client.get_game(name=names[0])
+            if game is not None:
+                self.set("game", game.id, game, self.game_ttl)
+            return {names[0]: game}
+
+        name = name.lower()
+        return (await self.load("game_name", [name], self.game_ttl, fetch))[name]
+
+    async def get_games(self, game_ids: Iterable[str]) -> List[twitch.Game]:
+        games = await self.load("game", game_ids, self.game_ttl, self._fetch_games)
+        return [game for game in games.values() if game is not None]
+
+    async def _fetch_games(self, ids: list):
+        games = {}
+        for batch in chunks(ids, 100):
+            async for game in self.client.get_games(batch):
+                games[game.id] = game
+        return games
+
+    # Streams
+
+    async def get_stream(self, user_id: str) -> Optional[dict]:
+        return (await self.get_streams([user_id]))[user_id]
+
+    async def get_streams(self, user_ids: Iterable[str]) -> Dict[str, Optional[dict]]:
+        async def fetch(ids):
+            streams = {}
+            for batch in chunks(ids, 100):
+                resp = await self.client.http.get_streams(batch)
+                for data in resp["data"]:
+                    streams[data["user_id"]] = data
+            return streams
+
+        return await self.load(
+            "stream", user_ids, self.stream_ttl, fetch, negative_ttl=self.stream_ttl
+        )
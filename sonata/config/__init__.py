@@ -1,7 +1,16 @@
 import json
 import pathlib
 
-from .settings import MongoConfig, BotConfig, TwitchConfig, ApiConfig, Yandex
+from .settings import (
+    MongoConfig,
+    BotConfig,
+    TwitchConfig,
+    ApiConfig,
+    Yandex,
+    CacheConfig,
+    ClusterConfig,
+    SessionConfig,
+)
 
 
 async def init_config(app):
@@ -25,11 +34,20 @@ async def init_config(app):
             setattr(ApiConfig, key, value)
         for key, value in data["Yandex"].items():
             setattr(Yandex, key, value)
+        for key, value in data.get("Cache", {}).items():
+            setattr(CacheConfig, key, value)
+        for key, value in data.get("Cluster", {}).items():
+            setattr(ClusterConfig, key, value)
+        for key, value in data.get("Session", {}).items():
+            setattr(SessionConfig, key, value)
     app["config"] = {
         "bot": BotConfig(),
         "mongo": MongoConfig(),
         "twitch": TwitchConfig(),
         "api": ApiConfig(),
         "yandex": Yandex(),
+        "cache": CacheConfig(),
+        "cluster": ClusterConfig(),
+        "session": SessionConfig(),
     }
     app["logger"].info("Config initialized")
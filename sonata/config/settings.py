@@ -1,4 +1,4 @@
-from typing import FrozenSet
+from typing import FrozenSet, List, Optional
 
 
 class BotConfig:
@@ -23,6 +23,24 @@ class BotConfig:
         return self.core_cogs | self.other_cogs
 
 
+class CacheConfig:
+    member_flags: Optional[List[str]] = None  # discord.MemberCacheFlags, None - intents
+    chunk_guilds_at_startup: bool = True
+    lazy_chunking: bool = False  # Chunk guilds on first command invocation
+    max_messages: Optional[int] = 1000
+
+
+class ClusterConfig:
+    workers: int = 1  # Bot processes, each one runs a range of shards
+    shard_count: Optional[int] = None  # None - recommended by Discord
+    socket_dir: str = "/tmp/sonata"
+    separate_api: bool = False  # Run the web server in a process without a bot
+    lease_ttl: int = 30  # Seconds before a dead scheduler leader is replaced
+    lease_heartbeat: int = 10
+    scheduler_poll: int = 60  # Seconds between checks for jobs from other processes
+    worker_check_interval: int = 5  # Seconds between checks for exited workers
+
+
 class MongoConfig:
     host: str = "localhost"
     port: str = "27017"
@@ -42,11 +60,23 @@ class MongoConfig:
         return self.url + self.database
 
 
+class SessionConfig:
+    storage: str = "mongo"  # "mongo" or "cookie", encrypted sessions without storage
+    secret_key: str = None  # 32 bytes in URL-safe base64, required for cookies
+    max_age: int = 3600 * 24 * 30
+    cache_ttl: int = 300  # Seconds a Mongo session is kept in process
+    cache_size: int = 10000
+
+
 class TwitchConfig:
     client_id: str = None
     bearer_token: str = None
     hub_secret: str = None
     client_secret: str = None
+    polling: bool = False  # Poll Helix streams instead of WebSub subscriptions
+    poll_interval: int = 60
+    alert_workers: int = 8
+    alert_rate: float = 20  # Alert requests per second, below the global limit
 
 
 class ApiConfig:
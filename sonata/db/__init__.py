@@ -2,17 +2,31 @@ import asyncio
 
 from aiohttp_security import setup as setup_security, SessionIdentityPolicy
 from aiohttp_session import setup as setup_session
-from aiohttp_session_mongo import MongoStorage
 from motor import motor_asyncio as motorio
+from pymongo import ASCENDING, DESCENDING
 
 from sonata.db.logging import setup_logger
 from sonata.db.db_auth import DBAuthorizationPolicy
+from sonata.db.sessions import make_storage
 
 
 async def close_mongo(app):
     app["db"].client.close()
 
 
+async def ensure_indexes(db):
+    """Creates indexes that queries rely on, existing ones are left as is"""
+    # Keyset pagination of the leaderboard
+    await db.user_stats.create_index(
+        [("guild_id", ASCENDING), ("exp", DESCENDING), ("user_id", ASCENDING)]
+    )
+    # One rollup per period, concurrent upserts would create duplicates otherwise
+    await db.stats_rollups.create_index(
+        [("guild_id", ASCENDING), ("period", ASCENDING), ("date", ASCENDING)],
+        unique=True,
+    )
+
+
 async def init_db(app):
     setup_logger()
     app["db"] = db = motorio.AsyncIOMotorClient(
@@ -20,6 +34,6 @@ async def init_db(app):
     )[app["config"]["mongo"].database]
     app["logger"].info("Mongo connected.")
     app.on_cleanup.append(close_mongo)
-    session_collection = db.sessions
-    setup_session(app, MongoStorage(session_collection, max_age=3600 * 24 * 30))
+    await ensure_indexes(db)
+    setup_session(app, make_storage(db, app["config"]["session"]))
     setup_security(app, SessionIdentityPolicy(), DBAuthorizationPolicy(db))
@@ -1,13 +1,30 @@
+import time
+
 from aiohttp_security import AbstractAuthorizationPolicy
 
 
 class DBAuthorizationPolicy(AbstractAuthorizationPolicy):
+    users_ttl = 60  # Seconds a known user is not looked up again
+    users_maxsize = 10000
+
     def __init__(self, db):
         self.db = db
+        self._users = {}  # Identity: expires at
 
     async def authorized_userid(self, identity: str):
+        expires_at = self._users.get(identity)
+        if expires_at is not None and expires_at >= time.monotonic():
+            return identity
+
         cursor = self.db.users.find({"id": int(identity)}, {"id": True})
-        return identity if await cursor.fetch_next else None
+        if not await cursor.fetch_next:
+            self._users.pop(identity, None)
+            return None
+
+        if len(self._users) >= self.users_maxsize:
+            self._users.clear()
+        self._users[identity] = time.monotonic() + self.users_ttl
+        return identity
 
     async def permits(self, identity, permission, context=None):
         """
@@ -0,0 +1,125 @@
+import asyncio
+import logging
+import os
+import socket
+import time
+import uuid
+from typing import Callable
+
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError, PyMongoError
+
+logger = logging.getLogger("discord")
+
+
+class Lease:
+    """Lease-based leader election stored in Mongo.
+
+    The holder renews the lease every ``heartbeat`` seconds. If it stops renewing,
+    the lease expires after ``ttl`` seconds and the next follower to heartbeat takes
+    it over, so failover takes at most ``ttl + heartbeat`` seconds. A holder that
+    fails to renew steps down immediately, and so does a holder whose last renewal
+    is older than ``ttl - margin`` by its own monotonic clock, e.g. after a stalled
+    event loop.
+
+    Expiry is computed with the clock of the Mongo server, so hosts don't need
+    synchronized clocks. This needs MongoDB 4.2 for ``$$NOW`` in updates.
+    """
+
+    margin = 5  # Seconds before the expiry at which the holder stops leading
+
+    def __init__(
+        self,
+        collection,
+        name: str,
+        *,
+        ttl: int = 30,
+        heartbeat: int = 10,
+        dispatch: Callable = None,
+    ):
+        self.collection = collection
+        self.name = name
+        self.ttl = ttl
+        self.heartbeat = heartbeat
+        self.dispatch = dispatch
+        self.identity = f"{socket.gethostname()}-{os.getpid()}-{uuid.uuid4().hex[:8]}"
+        self._is_leader = asyncio.Event()
+        self._renewed_at = 0.0  # Monotonic time of the last successful renewal
+
+    @property
+    def is_expired(self):
+        return time.monotonic() - self._renewed_at >= self.ttl - self.margin
+
+    @property
+    def is_leader(self):
+        return self._is_leader.is_set() and not self.is_expired
+
+    async def wait(self):
+        """Waits until this process holds the lease"""
+        await self._is_leader.wait()
+
+    async def try_acquire(self):
+        started_at = time.monotonic()
+        try:
+            lease = await self.collection.find_one_and_update(
+                {
+                    "_id": self.name,
+                    "$or": [
+                        {"holder": self.identity},
+                        {"$expr": {"$lt": ["$expires_at", "$$NOW"]}},
+                    ],
+                },
+                [
+                    {
+                        "$set": {
+                            "holder": self.identity,
+                            "renewed_at": "$$NOW",
+                            "expires_at": {"$add": ["$$NOW", self.ttl * 1000]},
+                        }
+                    }
+                ],
+                upsert=True,
+                return_document=ReturnDocument.AFTER,
+            )
+        except DuplicateKeyError:  # The lease is held by another process
+            return False
+
+        acquired = lease is not None and lease["holder"] == self.identity
+        if acquired:  # Counted from the request, the server may have renewed it later
+            self._renewed_at = started_at
+        return acquired
+
+    def step_down(self):
+        self._is_leader.clear()
+        logger.warning(f"Lease {self.name} lost by {self.identity}")
+        if self.dispatch:
+            self.dispatch("leadership_lost", self.name)
+
+    async def run(self):
+        try:
+            while True:
+                if self._is_leader.is_set() and self.is_expired:
+                    self.step_down()  # The loop stalled past the renewal deadline
+                try:
+                    # Gives up before the renewal deadline would pass
+                    timeout = max(self.ttl - self.margin - self.heartbeat, 1)
+                    acquired = await asyncio.wait_for(self.try_acquire(), timeout)
+                except (PyMongoError, asyncio.TimeoutError) as e:
+                    logger.warning(f"Failed to renew lease {self.name}: {e!r}")
+                    acquired = False
+
+                if acquired and not self._is_leader.is_set():
+                    self._is_leader.set()
+                    logger.info(f"Lease {self.name} acquired by {self.identity}")
+                    if self.dispatch:
+                        self.dispatch("leadership_acquired", self.name)
+                elif not acquired and self._is_leader.is_set():
+                    self.step_down()
+
+                await asyncio.sleep(self.heartbeat)
+        finally:
+            self._is_leader.clear()
+
+    async def release(self):
+        self._is_leader.clear()
+        await self.collection.delete_one({"_id": self.name, "holder": self.identity})
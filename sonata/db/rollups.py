@@ -0,0 +1,100 @@
+from datetime import datetime, timedelta
+from typing import List, Optional
+
+from pymongo import ReplaceOne, UpdateOne
+from pymongo.errors import BulkWriteError
+
+DUPLICATE_KEY = 11000
+GRANULARITIES = ("day", "week", "month")
+HOURS_OF_WEEK = 7 * 24
+COUNTERS = ("total_messages", "commands_invoked")
+
+
+def period_start(dt: datetime, granularity: str) -> datetime:
+    """Start of the day, the week (Monday) or the month of the date"""
+    date = dt.replace(hour=0, minute=0, second=0, microsecond=0)
+    if granularity == "week":
+        return date - timedelta(days=date.weekday())
+    if granularity == "month":
+        return date.replace(day=1)
+    return date
+
+
+def hour_of_week(dt: datetime) -> int:
+    return dt.weekday() * 24 + dt.hour
+
+
+def rollup_requests(guild_id: int, dt: datetime, inc: dict, activity: bool = False):
+    """Updates of the ``stats_rollups`` collection, see write_rollups.
+
+    Weekly and monthly counters are incremented like daily stats. Messages are
+    also counted in the hour-of-week activity matrix of the guild.
+    """
+    requests = [
+        UpdateOne(
+            {
+                "guild_id": guild_id,
+                "period": granularity,
+                "date": period_start(dt, granularity),
+            },
+            {"$inc": inc},
+            upsert=True,
+        )
+        for granularity in ("week", "month")
+    ]
+    if activity:
+        matrix = {"guild_id": guild_id, "period": "hour_of_week"}
+        requests.append(
+            UpdateOne(
+                matrix, {"$setOnInsert": {"hours": [0] * HOURS_OF_WEEK}}, upsert=True
+            )
+        )
+        hour = f"hours.{hour_of_week(dt)}"
+        requests.append(UpdateOne(matrix, {"$inc": {hour: inc["total_messages"]}}))
+    return requests
+
+
+async def write_rollups(db, requests: list, retries: int = 2):
+    """Writes the requests in order.
+
+    When two upserts race to create a rollup, the unique index rejects one. The
+    write is then retried from the rejected request, which now updates the
+    existing document.
+    """
+    for attempt in range(retries + 1):
+        try:
+            await db.stats_rollups.bulk_write(requests)
+            return
+        except BulkWriteError as e:
+            errors = e.details["writeErrors"]
+            if attempt == retries or errors[0]["code"] != DUPLICATE_KEY:
+                raise
+            requests = requests[errors[0]["index"] :]
+
+
+async def rebuild_rollups(db, guild_ids: Optional[List[int]] = None) -> int:
+    """Recomputes weekly and monthly rollups from daily stats.
+
+    The activity matrix has no hours in daily stats and is kept as is.
+    """
+    filter_ = {"guild_id": {"$in": guild_ids}} if guild_ids is not None else {}
+    rollups = {}
+    async for daily in db.daily_stats.find(filter_, {"_id": False}):
+        for granularity in ("week", "month"):
+            date = period_start(daily["date"], granularity)
+            key = (daily["guild_id"], granularity, date)
+            rollup = rollups.setdefault(key, dict.fromkeys(COUNTERS, 0))
+            for counter in COUNTERS:
+                rollup[counter] += daily.get(counter, 0)
+
+    requests = [
+        ReplaceOne(
+            {"guild_id": guild_id, "period": granularity, "date": date},
+            {"guild_id": guild_id, "period": granularity, "date": date, **counters},
+            upsert=True,
+        )
+        for (guild_id, granularity, date), counters in rollups.items()
+    ]
+    for i in range(0, len(requests), 1000):
+        await db.stats_rollups.bulk_write(requests[i : i + 1000], ordered=False)
+    return len(requests)
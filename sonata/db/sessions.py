@@ -0,0 +1,78 @@
+import base64
+import copy
+import time
+from collections import OrderedDict
+
+from aiohttp_session import Session
+from aiohttp_session.nacl_storage import NaClCookieStorage
+from aiohttp_session_mongo import MongoStorage
+
+
+class CachedMongoStorage(MongoStorage):
+    """Mongo sessions with an in-process LRU in front.
+
+    Saved sessions are written through to Mongo and to the cache, so loading a
+    session only goes to Mongo on a miss. Other processes see a change after their
+    cached entry expires, which is why ``ttl`` is kept short.
+    """
+
+    def __init__(self, collection, *, ttl: int = 300, maxsize: int = 10000, **kwargs):
+        super().__init__(collection, **kwargs)
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self._sessions = OrderedDict()  # Session key: (expires at, data)
+
+    def _get(self, key: str):
+        entry = self._sessions.get(key)
+        if entry is None:
+            return None
+        if entry[0] < time.monotonic():
+            del self._sessions[key]
+            return None
+        self._sessions.move_to_end(key)
+        return copy.deepcopy(entry[1])
+
+    def _set(self, key: str, data: dict):
+        ttl = self.ttl
+        if self.max_age is not None:
+            ttl = min(ttl, self.max_age)
+        # Copied, so that unsaved changes of a request's session don't leak
+        self._sessions[key] = (time.monotonic() + ttl, copy.deepcopy(data))
+        self._sessions.move_to_end(key)
+        while len(self._sessions) > self.maxsize:
+            self._sessions.popitem(last=False)
+
+    async def load_session(self, request):
+        cookie = self.load_cookie(request)
+        if cookie is not None:
+            data = self._get(str(cookie))
+            if data is not None:
+                return Session(str(cookie), data=data, new=False, max_age=self.max_age)
+
+        session = await super().load_session(request)
+        if session.identity is not None:
+            self._set(session.identity, self._get_session_data(session))
+        return session
+
+    async def save_session(self, request, response, session):
+        if session.identity is None:
+            session.set_new_identity(self._key_factory())
+        await super().save_session(request, response, session)
+        if session.empty:
+            self._sessions.pop(str(session.identity), None)
+        else:
+            self._set(str(session.identity), self._get_session_data(session))
+
+
+def make_storage(db, config):
+    """Session storage picked by the ``Session`` config section"""
+    if config.storage == "cookie":
+        # Signed and encrypted, nothing is stored on the server
+        secret_key = base64.urlsafe_b64decode(config.secret_key)
+        return NaClCookieStorage(secret_key, max_age=config.max_age)
+    return CachedMongoStorage(
+        db.sessions,
+        ttl=config.cache_ttl,
+        maxsize=config.cache_size,
+        max_age=config.max_age,
+    )
@@ -0,0 +1,21 @@
+from .client import IPCClient, socket_path
+from .errors import IPCError
+from .server import IPCServer
+
+
+async def close_ipc(app):
+    app["ipc"].close()
+    if "ipc_server" in app:
+        await app["ipc_server"].close()
+
+
+async def init_ipc(app):
+    cluster = app["cluster"]
+    app["ipc"] = IPCClient(app)
+    if "bot" in app and (cluster["workers"] > 1 or cluster["separate_api"]):
+        app["ipc_server"] = server = IPCServer(
+            app["bot"], socket_path(cluster["socket_dir"], cluster["worker_id"])
+        )
+        await server.start()
+    app.on_cleanup.append(close_ipc)
+    app["logger"].info("IPC initialized")
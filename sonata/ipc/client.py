@@ -0,0 +1,159 @@
+import asyncio
+import itertools
+import json
+from typing import List, Optional
+
+from . import endpoints
+from .errors import IPCError
+from .server import STREAM_LIMIT
+
+
+class Connection:
+    """A multiplexed connection to a single worker"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._writer: Optional[asyncio.StreamWriter] = None
+        self._futures = {}
+        self._ids = itertools.count()
+        self._lock = asyncio.Lock()
+
+    async def connect(self):
+        async with self._lock:
+            if self._writer is not None and not self._writer.is_closing():
+                return
+            try:
+                reader, self._writer = await asyncio.open_unix_connection(
+                    self.path, limit=STREAM_LIMIT
+                )
+            except OSError:
+                raise IPCError(503, f"Worker {self.path} is unavailable")
+            asyncio.ensure_future(self.read(reader))
+
+    async def read(self, reader: asyncio.StreamReader):
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                response = json.loads(line)
+                future = self._futures.pop(response["id"], None)
+                if future is not None and not future.done():
+                    future.set_result(response)
+        except (ConnectionError, ValueError):
+            pass
+        finally:
+            self._writer = None
+            for future in self._futures.values():
+                if not future.done():
+                    future.set_exception(IPCError(503, "Worker disconnected"))
+            self._futures.clear()
+
+    async def request(self, op: str, kwargs: dict, timeout: float):
+        await self.connect()
+        request_id = next(self._ids)
+        future = self._futures[request_id] = asyncio.get_event_loop().create_future()
+        self._writer.write(
+            json.dumps({"id": request_id, "op": op, "kwargs": kwargs}).encode("utf-8")
+            + b"\n"
+        )
+        try:
+            response = await asyncio.wait_for(future, timeout)
+        except asyncio.TimeoutError:
+            self._futures.pop(request_id, None)
+            raise IPCError(504, f"Operation {op} timed out")
+
+        if response["status"] != 200:
+            raise IPCError(response["status"], response["data"])
+
+        return response["data"]
+
+    def close(self):
+        if self._writer is not None:
+            self._writer.close()
+
+
+class IPCClient:
+    """Routes IPC operations to the worker that owns the guild.
+
+    Operations addressed to the local worker are called directly.
+    """
+
+    def __init__(self, app, timeout: float = 10.0):
+        cluster = app["cluster"]
+        self.bot = app.get("bot")
+        self.worker_id = cluster["worker_id"]
+        self.workers = cluster["workers"]
+        self.shard_count = cluster["shard_count"]
+        self.shards_per_worker = cluster["shards_per_worker"]
+        self.socket_dir = cluster["socket_dir"]
+        self.timeout = timeout
+        self._connections = {}
+        self._next_worker = itertools.cycle(range(self.workers))
+
+    def worker_for(self, guild_id: int) -> int:
+        if self.workers == 1:
+            return 0
+
+        shard_id = (guild_id >> 22) % self.shard_count
+        return shard_id // self.shards_per_worker
+
+    def connection(self, worker_id: int) -> Connection:
+        connection = self._connections.get(worker_id)
+        if connection is None:
+            connection = self._connections[worker_id] = Connection(
+                socket_path(self.socket_dir, worker_id)
+            )
+        return connection
+
+    async def request_worker(self, worker_id: int, op: str, **kwargs):
+        if worker_id == self.worker_id and self.bot is not None:
+            return await endpoints.call(self.bot, op, kwargs)
+
+        return await self.connection(worker_id).request(op, kwargs, self.timeout)
+
+    async def request(self, op: str, *, guild_id: int, **kwargs):
+        """Calls the operation on the worker that owns the guild"""
+        return await self.request_worker(
+            self.worker_for(guild_id), op, guild_id=guild_id, **kwargs
+        )
+
+    async def request_any(self, op: str, **kwargs):
+        """Calls the operation that does not depend on shards on any worker"""
+        if self.bot is not None:
+            return await endpoints.call(self.bot, op, kwargs)
+
+        return await self.request_worker(next(self._next_worker), op, **kwargs)
+
+    async def broadcast(self, op: str, **kwargs) -> list:
+        """Calls the operation on every worker"""
+        return await asyncio.gather(
+            *(
+                self.request_worker(worker_id, op, **kwargs)
+                for worker_id in range(self.workers)
+            )
+        )
+
+    async def map_guilds(self, op: str, guild_ids: List[int], **kwargs) -> list:
+        """Calls the operation on each worker with the guilds it owns.
+
+        The operation must return a list, the results are concatenated.
+        """
+        partitions = {}
+        for guild_id in guild_ids:
+            partitions.setdefault(self.worker_for(guild_id), []).append(guild_id)
+        results = await asyncio.gather(
+            *(
+                self.request_worker(worker_id, op, guild_ids=ids, **kwargs)
+                for worker_id, ids in partitions.items()
+            )
+        )
+        return list(itertools.chain.from_iterable(results))
+
+    def close(self):
+        for connection in self._connections.values():
+            connection.close()
+
+
+def socket_path(socket_dir: str, worker_id: int):
+    return f"{socket_dir}/sonata-{worker_id}.sock"
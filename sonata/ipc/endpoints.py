@@ -0,0 +1,234 @@
+import asyncio
+from typing import List, Union
+
+import discord
+
+from sonata.bot import cogs as extensions
+from sonata.bot.utils import i18n
+from sonata.db.models import ModlogCase, Reminder
+from .errors import IPCError
+
+ENDPOINTS = {}
+
+
+def endpoint(func):
+    """Registers a coroutine as an IPC operation"""
+    ENDPOINTS[func.__name__] = func
+    return func
+
+
+async def call(bot, op: str, kwargs: dict):
+    try:
+        func = ENDPOINTS[op]
+    except KeyError:
+        raise IPCError(404, f"Unknown operation {op}")
+
+    return await func(bot, **kwargs)
+
+
+async def get_guild(bot, guild_id: int) -> discord.Guild:
+    try:
+        return bot.get_guild(guild_id) or await bot.fetch_guild(guild_id)
+    except discord.Forbidden:
+        raise IPCError(403)
+    except discord.HTTPException:
+        raise IPCError(500)
+
+
+async def get_member(guild: discord.Guild, user_id: int) -> discord.Member:
+    try:
+        return guild.get_member(user_id) or await guild.fetch_member(user_id)
+    except discord.Forbidden:
+        raise IPCError(403)
+    except discord.HTTPException:
+        raise IPCError(500)
+
+
+def guild_to_dict(guild: discord.Guild):
+    return {
+        "id": guild.id,
+        "name": guild.name,
+        "channel_count": len(guild.channels),
+        "member_count": guild.member_count,
+        "role_count": len(guild.roles),
+        "avatar": str(guild.icon_url),
+    }
+
+
+def channel_to_dict(channel: Union[discord.TextChannel, discord.VoiceChannel]):
+    return {
+        "id": channel.id,
+        "name": channel.name,
+        "type": str(channel.type),
+        "bot_permissions": dict(channel.permissions_for(channel.guild.me)),
+    }
+
+
+def role_to_dict(role: discord.Role):
+    return {
+        "id": role.id,
+        "name": role.name,
+        "position": role.position,
+        "mentionable": role.mentionable,
+        "color": str(role.color),
+        "permissions": dict(role.permissions),
+    }
+
+
+@endpoint
+async def stats(bot):
+    return {"guilds": len(bot.guilds), "members": len(bot.users)}
+
+
+@endpoint
+async def dispatch(bot, event: str, args: list):
+    bot.dispatch(event, *args)
+
+
+@endpoint
+async def cogs(bot):
+    return sorted(filter(lambda c: c != "Owner", bot.cogs.keys()))
+
+
+@endpoint
+async def cog(bot, name: str, locale: str):
+    try:
+        return bot.catalog.get(locale)["cogs"][name]
+    except KeyError:
+        raise IPCError(404, "Cog not found")
+
+
+@endpoint
+async def update_translations(bot):
+    i18n.update_translations()
+    bot.catalog.invalidate()
+
+
+@endpoint
+async def manage_extension(bot, action: str, cog_name: str):
+    """Loads, unloads or reloads the cog, the catalog is invalidated with it"""
+    {
+        "load": extensions.load_extension,
+        "unload": extensions.unload_extension,
+        "reload": extensions.reload_extension,
+    }[action](bot, cog_name)
+
+
+@endpoint
+async def catalog_version(bot, locale: str):
+    return bot.catalog.get(locale)["version"]
+
+
+@endpoint
+async def command_search(bot, query: str, limit: int, locale: str):
+    return bot.catalog.search(locale, query, limit)
+
+
+@endpoint
+async def modlog_case_expire(bot, guild_id: int, case: dict):
+    bot.dispatch("modlog_case_expire", ModlogCase(**case))
+
+
+@endpoint
+async def reminder_complete(bot, reminder: dict, guild_id: int = None):
+    bot.dispatch("reminder_complete", Reminder(**reminder))
+
+
+@endpoint
+async def guild_perms(bot, guild_id: int, user_id: int):
+    """Returns the guild if the user is its administrator"""
+    guild = await get_guild(bot, guild_id)
+    member = await get_member(guild, user_id)
+    if not await bot.is_admin(member):
+        raise IPCError(403)
+
+    return guild_to_dict(guild)
+
+
+@endpoint
+async def guild_channels(bot, guild_id: int):
+    guild = await get_guild(bot, guild_id)
+    result = []
+    for category, channels in guild.by_category():
+        if category:
+            category = {"id": category.id, "name": category.name}
+        else:
+            category = {"id": None, "name": None}
+        category["channels"] = list(map(channel_to_dict, channels))
+        result.append(category)
+    return result
+
+
+@endpoint
+async def guild_roles(bot, guild_id: int):
+    guild = await get_guild(bot, guild_id)
+    return list(map(role_to_dict, guild.roles))
+
+
+@endpoint
+async def guild_emojis(bot, guild_id: int):
+    return [
+        {"id": emoji.id, "name": emoji.name}
+        for emoji in bot.emojis
+        if emoji.guild_id == guild_id
+    ]
+
+
+@endpoint
+async def member_names(bot, guild_id: int, user_ids: List[int]):
+    """Returns ``[id, name]`` pairs of the found members.
+
+    Members missing from the cache are fetched a few at a time.
+    """
+    guild = await get_guild(bot, guild_id)
+    semaphore = asyncio.Semaphore(5)
+
+    async def resolve(user_id: int):
+        member = guild.get_member(user_id)
+        if member is None:
+            async with semaphore:
+                try:
+                    member = await get_member(guild, user_id)
+                except IPCError:
+                    return None
+        return [user_id, str(member)]
+
+    names = await asyncio.gather(*(resolve(user_id) for user_id in user_ids))
+    return [name for name in names if name is not None]
+
+
+@endpoint
+async def live_stats(bot, guild_id: int):
+    return bot.live_stats.take(guild_id)
+
+
+@endpoint
+async def user_guilds(bot, user_id: int, guild_ids: List[int]):
+    members = []
+    for guild_id in guild_ids:
+        try:
+            guild = await get_guild(bot, guild_id)
+            members.append(await get_member(guild, user_id))
+        except IPCError:
+            continue
+    admins = await bot.admin_members(members)
+    return [
+        {
+            "id": member.guild.id,
+            "name": member.guild.name,
+            "is_owner": admins[member.guild.id],
+        }
+        for member in members
+    ]
+
+
+@endpoint
+async def reset_admin_cache(bot, guild_id: int):
+    bot.admin_cache.invalidate(guild_id)
+
+
+@endpoint
+async def reset_locale_cache(bot, guild_id: int):
+    guild = await get_guild(bot, guild_id)
+    for channel in guild.text_channels:
+        await bot.cache.delete(f"locale_{channel.id}")
@@ -0,0 +1,10 @@
+class IPCError(Exception):
+    """Exception raised when an IPC request fails.
+
+    The status mirrors the HTTP status the web views respond with.
+    """
+
+    def __init__(self, status: int, reason: str = None):
+        super().__init__(reason or f"IPC request failed with status {status}")
+        self.status = status
+        self.reason = reason
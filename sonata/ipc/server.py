@@ -0,0 +1,64 @@
+import asyncio
+import json
+import logging
+import os
+
+from . import endpoints
+from .errors import IPCError
+
+STREAM_LIMIT = 2 ** 24
+
+logger = logging.getLogger("discord")
+
+
+class IPCServer:
+    """Serves IPC operations of a bot worker over a unix socket.
+
+    Requests and responses are newline-delimited JSON objects. Requests are handled
+    concurrently, so responses may arrive out of order and are matched by ``id``.
+    """
+
+    def __init__(self, bot, path: str):
+        self.bot = bot
+        self.path = path
+        self._server = None
+
+    async def start(self):
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        if os.path.exists(self.path):
+            os.remove(self.path)
+        self._server = await asyncio.start_unix_server(
+            self.handle_connection, path=self.path, limit=STREAM_LIMIT
+        )
+
+    async def close(self):
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+
+    async def handle_connection(
+        self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter
+    ):
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                asyncio.ensure_future(self.handle_request(json.loads(line), writer))
+        except (ConnectionError, ValueError):
+            pass
+        finally:
+            writer.close()
+
+    async def handle_request(self, request: dict, writer: asyncio.StreamWriter):
+        try:
+            data = await endpoints.call(self.bot, request["op"], request["kwargs"])
+            response = {"id": request["id"], "status": 200, "data": data}
+        except IPCError as e:
+            response = {"id": request["id"], "status": e.status, "data": e.reason}
+        except Exception as e:
+            logger.exception(f"IPC operation {request['op']} failed")
+            response = {"id": request["id"], "status": 500, "data": str(e)}
+
+        if not writer.is_closing():
+            writer.write(json.dumps(response).encode("utf-8") + b"\n")
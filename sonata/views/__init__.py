@@ -1,20 +1,60 @@
+from aiohttp import ClientSession
+
 from .cogs import CogList, Cog
 from .commands import CommandSearch
-from .guilds import Guilds, Guild, GuildStats, GuildEmojis, GuildMembers, GuildChannels, GuildRoles
+from .guilds import (
+    Guilds,
+    Guild,
+    GuildStats,
+    GuildActivity,
+    GuildLive,
+    GuildEmojis,
+    GuildMembers,
+    GuildChannels,
+    GuildRoles,
+    GuildExport,
+)
 from .auth import Auth, AuthCallback, AuthLogout
+from .cache import PermsCache, ResponseCache, conditional_get
+from .live import LiveHub
 from .locales import Locales
 from .users import UserMe
+from .webhooks import TwitchWebhook, WebhookQueue
+
+
+async def close_session(app):
+    await app["session"].close()
+
+
+async def close_webhooks(app):
+    app["webhooks"].close()
+
+
+async def close_live(app):
+    app["live"].close()
 
 
 async def init_views(app):
+    app["session"] = ClientSession()
+    app.on_cleanup.append(close_session)
+    app["webhooks"] = WebhookQueue(app)
+    app.on_cleanup.append(close_webhooks)
+    app["response_cache"] = ResponseCache()
+    app["perms_cache"] = PermsCache()
+    app["live"] = LiveHub(app)
+    app.on_cleanup.append(close_live)
+    app.middlewares.append(conditional_get)
     cors = app["cors"]
     cors.add(app.router.add_route("*", "/guilds", Guilds))
     cors.add(app.router.add_route("*", r"/guilds/{id}", Guild))
     cors.add(app.router.add_route("*", r"/guilds/{id}/stats", GuildStats))
+    cors.add(app.router.add_route("*", r"/guilds/{id}/activity", GuildActivity))
+    cors.add(app.router.add_route("*", r"/guilds/{id}/live", GuildLive))
     cors.add(app.router.add_route("*", r"/guilds/{id}/emojis", GuildEmojis))
     cors.add(app.router.add_route("*", r"/guilds/{id}/members", GuildMembers))
     cors.add(app.router.add_route("*", r"/guilds/{id}/channels", GuildChannels))
     cors.add(app.router.add_route("*", r"/guilds/{id}/roles", GuildRoles))
+    cors.add(app.router.add_route("*", r"/guilds/{id}/export", GuildExport))
     cors.add(app.router.add_route("*", r"/users/@me", UserMe))
     cors.add(app.router.add_route("*", "/cogs", CogList))
     cors.add(app.router.add_route("*", r"/cogs/{name}", Cog))
@@ -23,3 +63,4 @@ async def init_views(app):
     cors.add(app.router.add_route("*", "/auth/callback", AuthCallback))
     cors.add(app.router.add_route("*", "/auth/logout", AuthLogout))
     cors.add(app.router.add_route("*", "/locales", Locales))
+    cors.add(app.router.add_route("*", r"/wh/twitch/{topic}/{id}", TwitchWebhook))
@@ -43,7 +43,7 @@ class AuthCallback(web.View, CorsViewMixin):
             raise web.HTTPBadRequest
 
         app = self.request.app
-        bot = app.get("bot")
+        session = app["session"]
         uri = self.request.url.with_query(None)
         if not self.request.app["debug"]:
             uri = uri.with_scheme("https")
@@ -57,7 +57,7 @@ class AuthCallback(web.View, CorsViewMixin):
                 "scope": "identify guilds",
             }
         )
-        async with bot.session.post(
+        async with session.post(
             "https://discord.com/api/oauth2/token", data=user
         ) as r:
             if r.status != 200:
@@ -65,7 +65,7 @@ class AuthCallback(web.View, CorsViewMixin):
             oauth = await r.json()
         if "error" in oauth:
             raise web.HTTPBadRequest(reason=oauth["error"])
-        async with bot.session.get(
+        async with session.get(
             "https://discord.com/api/users/@me",
             headers={"Authorization": f"Bearer {oauth['access_token']}"},
         ) as r:
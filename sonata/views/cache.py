@@ -0,0 +1,96 @@
+import hashlib
+import time
+from typing import Optional
+
+from aiohttp import web
+
+from .responses import PRIVATE, dumps
+
+
+def make_etag(body: bytes):
+    return f'"{hashlib.sha1(body).hexdigest()}"'
+
+
+def is_not_modified(request: web.Request, etag: str):
+    if_none_match = request.headers.get("If-None-Match", "")
+    return etag in (tag.strip() for tag in if_none_match.split(",")) or (
+        if_none_match.strip() == "*"
+    )
+
+
+def not_modified(etag: str, cache_control: str):
+    return web.HTTPNotModified(headers={"ETag": etag, "Cache-Control": cache_control})
+
+
+@web.middleware
+async def conditional_get(request: web.Request, handler):
+    """Adds a strong ETag and Cache-Control to GET responses and answers 304.
+
+    Views may set their own ETag, for example from a content version. Otherwise it
+    is the hash of the body.
+    """
+    response = await handler(request)
+    if (
+        request.method not in ("GET", "HEAD")
+        or response.status != 200
+        or not isinstance(response, web.Response)
+    ):
+        return response
+
+    etag = response.headers.get("ETag")
+    if etag is None:
+        if not isinstance(response.body, bytes):
+            return response
+        etag = response.headers["ETag"] = make_etag(response.body)
+    cache_control = response.headers.setdefault("Cache-Control", PRIVATE)
+    if is_not_modified(request, etag):
+        raise not_modified(etag, cache_control)
+    return response
+
+
+class ResponseCache:
+    """Serialized responses keyed by content version and URL"""
+
+    maxsize = 1024
+
+    def __init__(self):
+        self._bodies = {}
+
+    async def get(self, version: str, request: web.Request, build) -> bytes:
+        key = (version, request.path_qs)
+        body = self._bodies.get(key)
+        if body is None:
+            if len(self._bodies) >= self.maxsize:
+                self._bodies.clear()
+            body = self._bodies[key] = dumps(await build())
+        return body
+
+
+class PermsCache:
+    """Guilds the user was allowed to manage, keyed by user and guild.
+
+    Entries of a guild are dropped when its admin roles are changed through the
+    API. Changes made on the bot side are seen after ``ttl``.
+    """
+
+    ttl = 10
+    maxsize = 10000
+
+    def __init__(self):
+        self._guilds = {}  # (user ID, guild ID): (expires at, guild)
+
+    def get(self, user_id: int, guild_id: int) -> Optional[dict]:
+        entry = self._guilds.get((user_id, guild_id))
+        if entry is None or entry[0] < time.monotonic():
+            return None
+
+        return entry[1]
+
+    def set(self, user_id: int, guild_id: int, guild: dict):
+        if len(self._guilds) >= self.maxsize:
+            self._guilds.clear()
+        self._guilds[(user_id, guild_id)] = (time.monotonic() + self.ttl, guild)
+
+    def invalidate(self, guild_id: int):
+        for key in [key for key in self._guilds if key[1] == guild_id]:
+            del self._guilds[key]
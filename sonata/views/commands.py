@@ -1,5 +1,3 @@
-import json
-
 from aiohttp import web
 
 from sonata.views.view import View
@@ -13,22 +11,9 @@ class CommandSearch(View):
         except TypeError:
             raise web.HTTPBadRequest
 
-        self.bot.locale = "ru_RU"
-        commands = []
-        for cmd in self.bot.walk_commands():
-            if len(commands) == limit:
-                break
-            if cmd.cog.qualified_name == "Owner" or not cmd.enabled or cmd.hidden:
-                continue
-            if cmd.qualified_name.startswith(query):
-                cmd_dict = cmd.to_dict()
-                if cmd_dict not in commands:
-                    commands.append(cmd.to_dict())
-        commands.sort(key=lambda c: c["qualified_name"])
-
-        return web.json_response(
-            text=json.dumps(
-                commands,
-                ensure_ascii=False,
+        async def build():
+            return await self.ipc(
+                "command_search", query=query, limit=limit, locale="ru_RU"
             )
-        )
\ No newline at end of file
+
+        return await self.catalog_response("ru_RU", build)
@@ -1,26 +1,57 @@
-import datetime as dt
-import json
+import asyncio
 import time
-from typing import Union
+import weakref
+from datetime import datetime
+from typing import Optional
 
-import discord
 from aiohttp import web
 from aiohttp_security import check_authorized
 from pydantic import ValidationError
 
+from .responses import dumps, json_response, stream_json, stream_rows
 from .view import View
 from ..db.models.guild import GuildUpdate
+from ..db.rollups import GRANULARITIES, HOURS_OF_WEEK, period_start
 
+EXPORT_COLUMNS = {
+    "user_stats": [
+        "user_id",
+        "exp",
+        "lvl",
+        "total_messages",
+        "commands_invoked",
+        "created_at",
+        "last_exp_at",
+    ],
+    "daily_stats": ["date", "total_messages", "commands_invoked"],
+    "emoji_stats": ["id", "total", "created_at"],
+}
 
-def date_converter(o):
-    if isinstance(o, (dt.datetime, dt.date)):
-        return int(time.mktime(o.timetuple()))
+
+def parse_date(value: Optional[str]) -> Optional[datetime]:
+    return datetime.strptime(value, "%Y-%m-%d") if value else None
+
+
+def pick_granularity(start: Optional[datetime], end: Optional[datetime]) -> str:
+    """The coarsest granularity that still gives a detailed chart of the range"""
+    if start is None:
+        return "day"
+    days = ((end or datetime.utcnow()) - start).days
+    if days > 730:
+        return "month"
+    if days > 92:
+        return "week"
+    return "day"
 
 
 class Guilds(View):
     async def get(self):
-        return web.json_response(
-            {"guilds": len(self.bot.guilds), "members": len(self.bot.users)}
+        stats = await self.request.app["ipc"].broadcast("stats")
+        return json_response(
+            {
+                "guilds": sum(s["guilds"] for s in stats),
+                "members": sum(s["members"] for s in stats),
+            }
         )
 
 
@@ -31,41 +62,37 @@ class GuildBase(View):
             guild_id = int(self.request.match_info["id"])
         except TypeError:
             raise web.HTTPBadRequest
-        try:
-            guild = self.bot.get_guild(guild_id) or await self.bot.fetch_guild(guild_id)
-            user = guild.get_member(user_id) or await guild.fetch_member(user_id)
-        except discord.Forbidden:
-            raise web.HTTPForbidden
-        except discord.HTTPException:
-            raise web.HTTPInternalServerError
-
-        if not await self.bot.is_admin(user):
-            raise web.HTTPForbidden
 
-        return user, guild
+        perms_cache = self.request.app["perms_cache"]
+        guild = perms_cache.get(user_id, guild_id)
+        if guild is None:
+            guild = await self.ipc("guild_perms", guild_id=guild_id, user_id=user_id)
+            perms_cache.set(user_id, guild_id, guild)
+        return user_id, guild
 
 
 class Guild(GuildBase):
     async def get(self):
-        user, guild = await self.check_perms()
-        guild_conf = await self.bot.db.guilds.find_one(
-            {"id": guild.id}, {"_id": False, "last_message_at": False, "left": False},
+        user_id, guild = await self.check_perms()
+        guild_conf = await self.db.guilds.find_one(
+            {"id": guild["id"]},
+            {"_id": False, "last_message_at": False, "left": False},
         )
         if not guild_conf:
             raise web.HTTPNotFound
         guild_conf.update(
             {
-                "channel_count": len(guild.channels),
-                "member_count": guild.member_count,
-                "role_count": len(guild.roles),
-                "avatar": str(guild.icon_url),
+                "channel_count": guild["channel_count"],
+                "member_count": guild["member_count"],
+                "role_count": guild["role_count"],
+                "avatar": guild["avatar"],
             }
         )
 
-        return web.json_response(text=json.dumps(guild_conf, default=date_converter))
+        return json_response(guild_conf)
 
     async def post(self):
-        user, guild = await self.check_perms()
+        user_id, guild = await self.check_perms()
         update = await self.request.json()
         try:
             update = GuildUpdate(**update)
@@ -75,56 +102,144 @@ class Guild(GuildBase):
             )
 
         update = update.dict(exclude_unset=True)
+        await self.db.guilds.update_one({"id": guild["id"]}, {"$set": update})
         if "locale" in update:
-            for channel in filter(
-                lambda ch: isinstance(ch, discord.TextChannel), guild.channels
-            ):
-                await self.bot.cache.delete(f"locale_{channel.id}")
+            await self.ipc("reset_locale_cache", guild_id=guild["id"])
+        if "admin_roles" in update:
+            await self.ipc("reset_admin_cache", guild_id=guild["id"])
+            self.request.app["perms_cache"].invalidate(guild["id"])
 
-        self.bot.db.guilds.update_one({"id": guild.id}, {"$set": update})
         raise web.HTTPCreated
 
 
 class GuildStats(GuildBase):
     async def get(self):
-        user, guild = await self.check_perms()
-        cursor = self.bot.db.daily_stats.find(
-            {"guild_id": guild.id},
-            {"_id": False, "guild_id": False},
+        user_id, guild = await self.check_perms()
+        query = self.request.query
+        try:
+            start = parse_date(query.get("from"))
+            end = parse_date(query.get("to"))
+            limit = int(query.get("limit", "0"))
+        except ValueError:
+            raise web.HTTPBadRequest
+        granularity = query.get("granularity") or pick_granularity(start, end)
+        if granularity not in GRANULARITIES:
+            raise web.HTTPBadRequest
+
+        filter_ = {"guild_id": guild["id"]}
+        if granularity == "day":
+            collection = self.db.daily_stats
+        else:
+            collection = self.db.stats_rollups
+            filter_["period"] = granularity
+        if start or end:
+            filter_["date"] = {}
+        if start:
+            filter_["date"]["$gte"] = period_start(start, granularity)
+        if end:
+            filter_["date"]["$lte"] = end
+        cursor = collection.find(
+            filter_,
+            {"_id": False, "guild_id": False, "period": False},
             sort=[("date", -1)],
+            limit=limit,
         )
-        limit = self.request.query.get("limit")
-        stats = await cursor.to_list(int(limit) if limit else None)
 
-        return web.json_response(
-            text=json.dumps({"id": guild.id, "stats": stats}, default=date_converter)
+        return await stream_json(
+            self.request,
+            {"id": guild["id"], "granularity": granularity},
+            "stats",
+            cursor,
         )
 
 
+class GuildActivity(GuildBase):
+    async def get(self):
+        """Messages by hour of the week in UTC, Monday 00:00 first"""
+        user_id, guild = await self.check_perms()
+        matrix = await self.db.stats_rollups.find_one(
+            {"guild_id": guild["id"], "period": "hour_of_week"},
+            {"_id": False, "hours": True},
+        )
+        hours = matrix["hours"] if matrix else [0] * HOURS_OF_WEEK
+        return json_response({"id": guild["id"], "hours": hours})
+
+
+class GuildLive(GuildBase):
+    async def get(self):
+        """Server-sent events with stats deltas of the guild"""
+        user_id, guild = await self.check_perms()
+        hub = self.request.app["live"]
+        subscriber = hub.subscribe(guild["id"], user_id)
+        try:
+            response = web.StreamResponse(
+                headers={
+                    "Content-Type": "text/event-stream",
+                    "Cache-Control": "no-cache",
+                    "X-Accel-Buffering": "no",
+                }
+            )
+            await response.prepare(self.request)
+            await response.write(b"retry: 10000\n\n")
+            last_delta_at = time.monotonic()
+            while time.monotonic() - last_delta_at < hub.idle_timeout:
+                delta = await subscriber.get(hub.keepalive)
+                if delta is None:
+                    await response.write(b": keepalive\n\n")
+                    continue
+                last_delta_at = time.monotonic()
+                await response.write(b"event: stats\ndata: " + dumps(delta) + b"\n\n")
+            await response.write_eof()
+        except ConnectionResetError:
+            pass
+        finally:
+            hub.unsubscribe(subscriber)
+        return response
+
+
 class GuildEmojis(GuildBase):
     async def get(self):
-        user, guild = await self.check_perms()
-        emojis = filter(lambda e: e.guild_id == guild.id, self.bot.emojis)
-        cursor = self.bot.db.emoji_stats.find(
-            {"id": {"$in": [e.id for e in emojis]}},
+        user_id, guild = await self.check_perms()
+        emojis = await self.ipc("guild_emojis", guild_id=guild["id"])
+        if not emojis:
+            raise web.HTTPNotFound
+
+        names = {e["id"]: e["name"] for e in emojis}
+        cursor = self.db.emoji_stats.find(
+            {"id": {"$in": list(names)}},
             {"_id": False, "total": True, "id": True},
             sort=[("total", -1)],
         )
         emojis_stats = await cursor.to_list(None)
         for e in emojis_stats:
-            e.update({"name": self.bot.get_emoji(e["id"]).name})
-        if not emojis:
-            raise web.HTTPNotFound
+            e.update({"name": names[e["id"]]})
 
-        return web.json_response({"id": guild.id, "emojis": emojis_stats})
+        return json_response({"id": guild["id"], "emojis": emojis_stats})
 
 
 class GuildMembers(GuildBase):
     async def get(self):
-        user, guild = await self.check_perms()
-        limit = min(int(self.request.query.get("limit", "0")), 100)
-        cursor = self.bot.db.user_stats.find(
-            {"guild_id": guild.id},
+        user_id, guild = await self.check_perms()
+        query = self.request.query
+        try:
+            limit = int(query.get("limit", "100"))
+            if limit < 1:  # Zero would be no limit for Mongo
+                raise ValueError
+            limit = min(limit, 100)
+            # Keyset pagination, `after` is the `next` value of the previous page
+            after = query.get("after")
+            after_exp, after_id = map(int, after.split(":")) if after else (None, None)
+        except ValueError:
+            raise web.HTTPBadRequest
+
+        filter_ = {"guild_id": guild["id"]}
+        if after:
+            filter_["$or"] = [
+                {"exp": {"$lt": after_exp}},
+                {"exp": after_exp, "user_id": {"$gt": after_id}},
+            ]
+        cursor = self.db.user_stats.find(
+            filter_,
             {
                 "_id": False,
                 "guild_id": False,
@@ -132,75 +247,80 @@ class GuildMembers(GuildBase):
                 "last_exp_at": False,
                 "auto_lvl_msg": False,
             },
-            sort=[("exp", -1)],
+            sort=[("exp", -1), ("user_id", 1)],
             limit=limit,
         )
         member_stats = await cursor.to_list(None)
-        for member_s in member_stats:
-            member = await self.bot.db.users.find_one(
-                {"id": member_s["user_id"]}, {"_id": False, "name": True}
-            )
-            if not member:
-                try:
-                    member = guild.get_member(
-                        member_s["user_id"]
-                    ) or await guild.fetch_member(member_s["user_id"])
-                except discord.HTTPException:
-                    member_stats.remove(member_s)
-                    continue
-                else:
-                    member_name = str(member)
-            else:
-                member_name = member["name"]
-
-            member_s["name"] = member_name
-        return web.json_response(
-            text=json.dumps(
-                {"id": guild.id, "members": member_stats}, ensure_ascii=False
+        next_ = (
+            f"{member_stats[-1]['exp']}:{member_stats[-1]['user_id']}"
+            if len(member_stats) == limit
+            else None
+        )
+
+        user_ids = [m["user_id"] for m in member_stats]
+        cursor = self.db.users.find(
+            {"id": {"$in": user_ids}}, {"_id": False, "id": True, "name": True}
+        )
+        names = {user["id"]: user["name"] async for user in cursor}
+        misses = [user_id for user_id in user_ids if user_id not in names]
+        if misses:
+            names.update(
+                await self.ipc("member_names", guild_id=guild["id"], user_ids=misses)
             )
+        member_stats = [m for m in member_stats if m["user_id"] in names]
+        for member_s in member_stats:
+            member_s["name"] = names[member_s["user_id"]]
+        return json_response(
+            {"id": guild["id"], "members": member_stats, "next": next_}
         )
 
 
 class GuildChannels(GuildBase):
-    @staticmethod
-    def to_dict(channel: Union[discord.TextChannel, discord.VoiceChannel],):
-        return {
-            "id": channel.id,
-            "name": channel.name,
-            "type": str(channel.type),
-            "bot_permissions": dict(channel.permissions_for(channel.guild.me)),
-        }
-
     async def get(self):
-        user, guild = await self.check_perms()
-        result = []
-        for category, channels in guild.by_category():
-            if category:
-                category = {"id": category.id, "name": category.name}
-            else:
-                category = {"id": None, "name": None}
-            category["channels"] = list(map(self.to_dict, channels))
-            result.append(category)
-        return web.json_response(
-            text=json.dumps({"id": guild.id, "channels": result}, ensure_ascii=False)
-        )
+        user_id, guild = await self.check_perms()
+        channels = await self.ipc("guild_channels", guild_id=guild["id"])
+        return json_response({"id": guild["id"], "channels": channels})
 
 
 class GuildRoles(GuildBase):
-    @staticmethod
-    def to_dict(role: discord.Role):
-        return {
-            "id": role.id,
-            "name": role.name,
-            "position": role.position,
-            "mentionable": role.mentionable,
-            "color": str(role.color),
-            "permissions": dict(role.permissions),
-        }
+    async def get(self):
+        user_id, guild = await self.check_perms()
+        roles = await self.ipc("guild_roles", guild_id=guild["id"])
+        return json_response({"id": guild["id"], "roles": roles})
+
+
+class GuildExport(GuildBase):
+    export_concurrency = 2  # Per guild
+    batch_size = 1000
+    _semaphores = weakref.WeakValueDictionary()
 
     async def get(self):
-        user, guild = await self.check_perms()
-        roles = list(map(self.to_dict, guild.roles))
-        return web.json_response(
-            text=json.dumps({"id": guild.id, "roles": roles}, ensure_ascii=False)
-        )
+        """Streams a stats collection of the guild as NDJSON or CSV"""
+        user_id, guild = await self.check_perms()
+        collection = self.request.query.get("collection", "user_stats")
+        format_ = self.request.query.get("format", "ndjson")
+        if collection not in EXPORT_COLUMNS or format_ not in ("ndjson", "csv"):
+            raise web.HTTPBadRequest
+
+        semaphore = self._semaphores.get(guild["id"])
+        if semaphore is None:
+            semaphore = self._semaphores[guild["id"]] = asyncio.Semaphore(
+                self.export_concurrency
+            )
+        if semaphore.locked():
+            raise web.HTTPTooManyRequests(reason="Export is already in progress")
+
+        columns = EXPORT_COLUMNS[collection]
+        async with semaphore:
+            cursor = self.db[collection].find(
+                {"guild_id": guild["id"]},
+                {"_id": False, **dict.fromkeys(columns, True)},
+                batch_size=self.batch_size,
+            )
+            return await stream_rows(
+                self.request,
+                cursor,
+                format=format_,
+                columns=columns,
+                filename=f"{guild['id']}-{collection}",
+            )
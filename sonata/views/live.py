@@ -0,0 +1,129 @@
+import asyncio
+import collections
+from typing import Optional
+
+from aiohttp import web
+
+from sonata.ipc import IPCError
+
+
+class Subscriber:
+    """A dashboard stream of one guild.
+
+    Deltas that arrive while the stream is still writing are merged into one.
+    """
+
+    def __init__(self, guild_id: int, user_id: int):
+        self.guild_id = guild_id
+        self.user_id = user_id
+        self._pending = None
+        self._event = asyncio.Event()
+
+    def push(self, delta: dict):
+        pending = self._pending
+        if pending is None:
+            pending = self._pending = {
+                "messages": 0,
+                "commands": 0,
+                "members": {},
+                "emojis": {},
+            }
+        pending["messages"] += delta["messages"]
+        pending["commands"] += delta["commands"]
+        for member in delta["members"]:
+            merged = pending["members"].setdefault(
+                member["user_id"], {"user_id": member["user_id"], "messages": 0}
+            )
+            merged.update(member, messages=merged["messages"] + member["messages"])
+        for emoji in delta["emojis"]:
+            pending["emojis"][emoji["id"]] = (
+                pending["emojis"].get(emoji["id"], 0) + emoji["total"]
+            )
+        self._event.set()
+
+    async def get(self, timeout: float) -> Optional[dict]:
+        """Waits for the next delta, None on timeout"""
+        try:
+            await asyncio.wait_for(self._event.wait(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+        self._event.clear()
+        pending, self._pending = self._pending, None
+        return {
+            "messages": pending["messages"],
+            "commands": pending["commands"],
+            "members": list(pending["members"].values()),
+            "emojis": [
+                {"id": emoji_id, "total": amount}
+                for emoji_id, amount in pending["emojis"].items()
+            ],
+        }
+
+
+class LiveHub:
+    """Fans out live stats deltas to dashboard streams.
+
+    A single poller per guild takes the deltas from the worker that owns it once
+    per ``interval``, however many dashboards of the guild are open.
+    """
+
+    interval = 5
+    keepalive = 25
+    idle_timeout = 300  # Streams without deltas are closed, clients reconnect
+    max_connections = 1000
+    max_user_connections = 5
+
+    def __init__(self, app: web.Application):
+        self.app = app
+        self._guilds = {}  # Guild ID: set of subscribers
+        self._pollers = {}
+        self._users = collections.Counter()
+        self.connections = 0
+
+    def subscribe(self, guild_id: int, user_id: int) -> Subscriber:
+        if self.connections >= self.max_connections:
+            raise web.HTTPServiceUnavailable(reason="Too many live connections")
+        if self._users[user_id] >= self.max_user_connections:
+            raise web.HTTPTooManyRequests(reason="Too many live connections")
+
+        subscriber = Subscriber(guild_id, user_id)
+        self._guilds.setdefault(guild_id, set()).add(subscriber)
+        self._users[user_id] += 1
+        self.connections += 1
+        if guild_id not in self._pollers:
+            self._pollers[guild_id] = asyncio.ensure_future(self.poll(guild_id))
+        return subscriber
+
+    def unsubscribe(self, subscriber: Subscriber):
+        subscribers = self._guilds.get(subscriber.guild_id, set())
+        if subscriber not in subscribers:
+            return
+
+        subscribers.remove(subscriber)
+        if not subscribers:
+            del self._guilds[subscriber.guild_id]
+        self._users[subscriber.user_id] -= 1
+        if not self._users[subscriber.user_id]:
+            del self._users[subscriber.user_id]
+        self.connections -= 1
+
+    async def poll(self, guild_id: int):
+        try:
+            while guild_id in self._guilds:
+                try:
+                    delta = await self.app["ipc"].request(
+                        "live_stats", guild_id=guild_id
+                    )
+                except IPCError:
+                    delta = None
+                if delta:
+                    for subscriber in self._guilds.get(guild_id, ()):
+                        subscriber.push(delta)
+                await asyncio.sleep(self.interval)
+        finally:
+            self._pollers.pop(guild_id, None)
+
+    def close(self):
+        for poller in list(self._pollers.values()):
+            poller.cancel()
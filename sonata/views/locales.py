@@ -1,11 +1,22 @@
-import json
+import functools
 
 from aiohttp import web
 from aiohttp_cors import CorsViewMixin
 
+from sonata.bot.utils import i18n
 from sonata.bot.utils.misc import map_locale
+from .responses import STATIC, dumps
+
+
+@functools.lru_cache(maxsize=1)
+def locales_body(locales: frozenset):
+    return dumps(map_locale())
 
 
 class Locales(web.View, CorsViewMixin):
     async def get(self):
-        return web.json_response(text=json.dumps(map_locale(), ensure_ascii=False))
+        return web.Response(
+            body=locales_body(i18n.LOCALES),
+            content_type="application/json",
+            headers={"Cache-Control": STATIC},
+        )
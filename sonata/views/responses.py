@@ -0,0 +1,140 @@
+import calendar
+import csv
+import datetime as dt
+import io
+from typing import AsyncIterable, List
+
+import orjson
+from aiohttp import web
+
+PRIVATE = "private, no-cache"
+CATALOG = "public, max-age=60, must-revalidate"
+STATIC = "public, max-age=3600"
+
+OPTIONS = orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME
+
+
+def default(o):
+    """Dates are serialized as UNIX timestamps, naive ones are UTC"""
+    if isinstance(o, dt.datetime):
+        return calendar.timegm(o.utctimetuple())
+    if isinstance(o, dt.date):
+        return calendar.timegm(o.timetuple())
+    raise TypeError
+
+
+def dumps(obj) -> bytes:
+    return orjson.dumps(obj, default=default, option=OPTIONS)
+
+
+def json_response(data, *, status: int = 200, headers: dict = None) -> web.Response:
+    return web.Response(
+        body=dumps(data),
+        status=status,
+        content_type="application/json",
+        headers=headers,
+    )
+
+
+async def stream_json(
+    request: web.Request,
+    head: dict,
+    key: str,
+    items: AsyncIterable,
+    *,
+    chunk_size: int = 500,
+) -> web.StreamResponse:
+    """Streams ``{**head, key: [*items]}`` with chunked encoding.
+
+    Items are serialized and written in chunks, so the array is never held in
+    memory as a whole.
+    """
+    response = web.StreamResponse(
+        headers={"Content-Type": "application/json", "Cache-Control": PRIVATE}
+    )
+    response.enable_chunked_encoding()
+    await response.prepare(request)
+    opening = dumps(head)[:-1]  # Without the closing brace
+    if head:
+        opening += b","
+    await response.write(opening + dumps(key) + b":[")
+    separator = b""
+    chunk = []
+    async for item in items:
+        chunk.append(dumps(item))
+        if len(chunk) >= chunk_size:
+            await response.write(separator + b",".join(chunk))
+            separator = b","
+            chunk = []
+    if chunk:
+        await response.write(separator + b",".join(chunk))
+    await response.write(b"]}")
+    await response.write_eof()
+    return response
+
+
+def ndjson_line(item) -> bytes:
+    return dumps(item) + b"\n"
+
+
+class CSVEncoder:
+    """Encodes dicts as CSV lines of the columns, dates in ISO format"""
+
+    def __init__(self, columns: List[str]):
+        self._buffer = io.StringIO()
+        self._writer = csv.DictWriter(self._buffer, columns, extrasaction="ignore")
+
+    def _flush(self) -> bytes:
+        line = self._buffer.getvalue()
+        self._buffer.seek(0)
+        self._buffer.truncate()
+        return line.encode("utf-8")
+
+    def header(self) -> bytes:
+        self._writer.writeheader()
+        return self._flush()
+
+    def row(self, item: dict) -> bytes:
+        self._writer.writerow(
+            {
+                key: value.isoformat() if isinstance(value, dt.date) else value
+                for key, value in item.items()
+            }
+        )
+        return self._flush()
+
+
+async def stream_rows(
+    request: web.Request,
+    items: AsyncIterable,
+    *,
+    format: str,
+    columns: List[str],
+    filename: str,
+    chunk_size: int = 500,
+) -> web.StreamResponse:
+    """Streams items as an NDJSON or CSV attachment with chunked encoding"""
+    if format == "csv":
+        encoder = CSVEncoder(columns)
+        content_type, encode, head = "text/csv", encoder.row, encoder.header()
+    else:
+        content_type, encode, head = "application/x-ndjson", ndjson_line, b""
+    response = web.StreamResponse(
+        headers={
+            "Content-Type": content_type,
+            "Content-Disposition": f'attachment; filename="{filename}.{format}"',
+            "Cache-Control": PRIVATE,
+        }
+    )
+    response.enable_chunked_encoding()
+    await response.prepare(request)
+    chunk = [head]
+    async for item in items:
+        chunk.append(encode(item))
+        if len(chunk) >= chunk_size:
+            await response.write(b"".join(chunk))
+            chunk = []
+    if chunk:
+        await response.write(b"".join(chunk))
+    await response.write_eof()
+    return response
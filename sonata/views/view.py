@@ -2,8 +2,51 @@ from aiohttp import web
 from aiohttp.web_request import Request
 from aiohttp_cors import CorsViewMixin
 
+from sonata.ipc import IPCError
+from .cache import is_not_modified, not_modified
+from .responses import CATALOG
+
+http_exceptions = {
+    403: web.HTTPForbidden,
+    404: web.HTTPNotFound,
+    503: web.HTTPServiceUnavailable,
+    504: web.HTTPGatewayTimeout,
+}
+
 
 class View(web.View, CorsViewMixin):
     def __init__(self, request: Request):
         super().__init__(request)
-        self.bot = self.request.app["bot"]
+        self.bot = self.request.app.get("bot")  # None if the API runs separately
+        self.db = self.request.app["db"]
+
+    async def ipc(self, op: str, **kwargs):
+        """Calls the IPC operation on the worker that owns the guild.
+
+        Operations without a guild are called on any worker.
+        """
+        ipc = self.request.app["ipc"]
+        try:
+            if "guild_id" in kwargs:
+                return await ipc.request(op, **kwargs)
+            return await ipc.request_any(op, **kwargs)
+        except IPCError as e:
+            raise http_exceptions.get(e.status, web.HTTPInternalServerError)(
+                reason=e.reason
+            )
+
+    async def catalog_response(self, locale: str, build):
+        """Serves catalog data from serialized bytes while the catalog is unchanged"""
+        version = await self.ipc("catalog_version", locale=locale)
+        etag = f'"{version}"'
+        if is_not_modified(self.request, etag):
+            raise not_modified(etag, CATALOG)
+
+        body = await self.request.app["response_cache"].get(
+            version, self.request, build
+        )
+        return web.Response(
+            body=body,
+            content_type="application/json",
+            headers={"ETag": etag, "Cache-Control": CATALOG},
+        )
@@ -0,0 +1,201 @@
+import asyncio
+import collections
+import hashlib
+import hmac
+import time
+from json import JSONDecodeError
+
+from aiohttp import web
+from aiohttp_cors import CorsViewMixin
+
+from sonata.ipc import IPCError
+
+
+class ExpiringDict:
+    """Bounded dict whose entries expire after ttl seconds"""
+
+    def __init__(self, maxsize: int, ttl: int):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data = collections.OrderedDict()  # key: (expires at, value)
+
+    def get(self, key):
+        now = time.monotonic()
+        while self._data:  # Entries are ordered by expiry
+            oldest = next(iter(self._data.values()))
+            if oldest[0] >= now:
+                break
+            self._data.popitem(last=False)
+
+        entry = self._data.get(key)
+        return entry[1] if entry is not None else None
+
+    def set(self, key, value):
+        self._data.pop(key, None)
+        self._data[key] = (time.monotonic() + self.ttl, value)
+        if len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+
+class WebhookQueue:
+    """Deduplicates webhook notifications and dispatches them in the background.
+
+    A notification is a duplicate if its ID was seen recently or its payload is the
+    same as the last one for the topic. Events of a topic always go to the same
+    worker, so they are dispatched in order.
+    """
+
+    workers = 4
+    maxsize = 1000  # Per worker
+    dedupe_ttl = 10 * 60
+    dedupe_size = 10000
+    report_interval = 5 * 60  # Seconds between metrics in the log
+
+    def __init__(self, app: web.Application):
+        self.app = app
+        self._notifications = ExpiringDict(self.dedupe_size, self.dedupe_ttl)
+        self._payloads = ExpiringDict(self.dedupe_size, self.dedupe_ttl)
+        self._queues = [asyncio.Queue(self.maxsize) for _ in range(self.workers)]
+        self._tasks = [
+            asyncio.ensure_future(self.worker(queue)) for queue in self._queues
+        ]
+        self._tasks.append(asyncio.ensure_future(self.report()))
+        self.accepted = 0
+        self.duplicates = 0
+        self.dropped = 0
+        self.failed = 0
+
+    def put(self, topic: str, notification_id: str, body: bytes, event: str, args: list):
+        """Returns False if the queue is full and the notification should be retried"""
+        payload_hash = hashlib.sha256(body).hexdigest()
+        if (
+            notification_id and self._notifications.get(notification_id)
+        ) or self._payloads.get(topic) == payload_hash:
+            self.duplicates += 1
+            return True
+
+        queue = self._queues[hash(topic) % len(self._queues)]
+        try:
+            queue.put_nowait((event, args))
+        except asyncio.QueueFull:
+            self.dropped += 1
+            self.app["logger"].warning(f"Webhook queue is full, dropped {topic}")
+            return False
+
+        if notification_id:
+            self._notifications.set(notification_id, True)
+        self._payloads.set(topic, payload_hash)
+        self.accepted += 1
+        return True
+
+    async def worker(self, queue: asyncio.Queue):
+        ipc = self.app["ipc"]
+        while True:
+            event, args = await queue.get()
+            try:
+                await ipc.broadcast("dispatch", event=event, args=args)
+            except IPCError as e:
+                self.failed += 1
+                self.app["logger"].warning(
+                    f"Failed to dispatch webhook event {event}: {e}"
+                )
+            finally:
+                queue.task_done()
+
+    def metrics(self):
+        return {
+            "queue_depth": sum(queue.qsize() for queue in self._queues),
+            "accepted": self.accepted,
+            "duplicates": self.duplicates,
+            "dropped": self.dropped,
+            "failed": self.failed,
+        }
+
+    async def report(self):
+        """Logs the metrics when they change"""
+        last = None
+        while True:
+            await asyncio.sleep(self.report_interval)
+            metrics = self.metrics()
+            if metrics != last:
+                self.app["logger"].info(f"Webhook queue: {metrics}")
+                last = metrics
+
+    def close(self):
+        for task in self._tasks:
+            task.cancel()
+
+
+class TwitchWebhook(web.View, CorsViewMixin):
+    """Twitch WebSub callbacks.
+
+    Notifications are acknowledged right away and dispatched to the bots over IPC
+    by the webhook queue.
+    """
+
+    async def get(self):
+        query = self.request.query
+        try:
+            if query["hub.mode"] == "denied":
+                return web.Response(text="OK", status=200)
+
+            if query["hub.challenge"]:
+                await self.dispatch(
+                    "subscription_verify", [query["hub.topic"], query["hub.mode"]]
+                )
+                return web.Response(
+                    body=query["hub.challenge"], content_type="text/plain"
+                )
+        except KeyError:
+            return web.Response(text="Bad Request", status=400)
+
+        return web.Response(text="OK", status=200)
+
+    async def post(self):
+        app = self.request.app
+        body = await self.request.read()
+        if not app["debug"]:
+            signature = (
+                "sha256="
+                + hmac.new(
+                    app["config"]["twitch"].hub_secret.encode("utf-8"),
+                    body,
+                    hashlib.sha256,
+                ).hexdigest()
+            )
+            if signature != self.request.headers.get("X-Hub-Signature"):
+                return web.Response(text="Forbidden", status=403)
+
+        try:
+            json = await self.request.json()
+            data = json["data"]
+        except JSONDecodeError:
+            return web.Response(text="Bad Request", status=400)
+
+        try:
+            data = data[0]
+        except IndexError:
+            data = None
+
+        events = {"streams": "stream_changed"}
+        topic, id = self.request.match_info["topic"], self.request.match_info["id"]
+        if not app["webhooks"].put(
+            f"{topic}/{id}",
+            self.request.headers.get("Twitch-Notification-Id"),
+            body,
+            events[topic],
+            [data, id],
+        ):
+            return web.Response(text="Service Unavailable", status=503)
+
+        return web.Response(text="OK", status=200)
+
+    async def dispatch(self, event: str, args: list):
+        """Dispatches the event to any one of the bots"""
+        ipc = self.request.app["ipc"]
+        try:
+            await ipc.request_any("dispatch", event=event, args=args)
+        except IPCError as e:
+            self.request.app["logger"].warning(
+                f"Failed to dispatch webhook event {event}: {e}"
+            )